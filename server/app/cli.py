@@ -0,0 +1,77 @@
+"""
+Maintenance commands.
+
+Run from the server directory:
+    python -m app.cli init-db
+    python -m app.cli warmup [--concurrency N]
+    python -m app.cli backfill-images [--force]
+"""
+import os
+import argparse
+import asyncio
+
+
+def init_db(args: argparse.Namespace):
+    """
+    Create missing database tables. Run once per deploy, before the app
+    starts with DB_CREATE_TABLES_ON_STARTUP=false.
+    """
+    from app.database import create_tables
+
+    create_tables()
+    print("Database tables are up to date")
+
+
+def warmup(args: argparse.Namespace):
+    """
+    Create the random-question rows and pre-render their TTS audio.
+    """
+    from app.question_bank import WARMUP_CONCURRENCY, warm_up_question_bank
+
+    result = asyncio.run(warm_up_question_bank(concurrency=args.concurrency or WARMUP_CONCURRENCY))
+    print(result)
+
+
+def backfill_images(args: argparse.Namespace):
+    """
+    Create WebP variants for saved images that do not have them yet.
+    """
+    from app.utils.image_variants import VARIANT_SIZES, create_variants, variant_urls
+
+    image_dir = "./static/images/"
+    created = failed = 0
+    for file_name in sorted(os.listdir(image_dir)):
+        if not file_name.endswith(".png"):
+            continue
+        if not args.force and set(variant_urls(f"/static/images/{file_name}")) >= {"webp", *VARIANT_SIZES}:
+            continue
+        try:
+            create_variants(os.path.join(image_dir, file_name))
+            created += 1
+        except Exception as e:
+            print(f"Variant generation failed for {file_name}: {e}")
+            failed += 1
+    print({"created": created, "failed": failed})
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    init_db_parser = subparsers.add_parser("init-db", help="Create missing database tables")
+    init_db_parser.set_defaults(func=init_db)
+
+    warmup_parser = subparsers.add_parser("warmup", help="Pre-render TTS for the random question bank")
+    warmup_parser.add_argument("--concurrency", type=int, help="Maximum TTS calls in flight")
+    warmup_parser.set_defaults(func=warmup)
+
+    backfill_parser = subparsers.add_parser("backfill-images", help="Create WebP variants for existing record images")
+    backfill_parser.add_argument("--force", action="store_true", help="Regenerate variants that already exist")
+    backfill_parser.set_defaults(func=backfill_images)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
-from sqlalchemy.orm import Session
+import json
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy.exc import IntegrityError
 from app import models, schemas
-from typing import List, Optional
+from app.pagination import PageParams, load_columns, paginate
+from typing import List, Optional, Set, Tuple
 
 
 # Elders
@@ -12,6 +14,36 @@ def get_elder_by_id(db: Session, elder_id: int):
     return db.query(models.Elder).filter(models.Elder.id == elder_id).first()
 
 
+def _with_columns(query, model, fields: Optional[Set[str]]):
+    """
+    Restrict a query to the columns of the requested response fields.
+    """
+    columns = load_columns(model, fields)
+    return query if columns is None else query.options(columns)
+
+
+def get_answers_page(
+    db: Session, elder_id: Optional[int], page: PageParams, fields: Optional[Set[str]] = None
+) -> Tuple[List[models.Answer], Optional[str]]:
+    """
+    Retrieve a page of answers, newest first, reading only the requested fields.
+    """
+    query = _with_columns(db.query(models.Answer), models.Answer, fields)
+    if elder_id is not None:
+        query = query.filter(models.Answer.elder_id == elder_id)
+    return paginate(query, models.Answer, page)
+
+
+def get_questions_page(
+    db: Session, page: PageParams, fields: Optional[Set[str]] = None
+) -> Tuple[List[models.Question], Optional[str]]:
+    """
+    Retrieve a page of questions, newest first, reading only the requested fields.
+    """
+    query = _with_columns(db.query(models.Question), models.Question, fields)
+    return paginate(query, models.Question, page)
+
+
 def get_answers_by_question_id(db: Session, question_id: int):
     """
     Retrieve all answers for a specific question ID.
@@ -64,6 +96,42 @@ def create_record(db: Session, record: schemas.RecordCreate) -> models.Record:
 
 
 
+def add_record_with_details(db: Session, record: schemas.RecordCreate, keyword_ids: List[int], image_url: str, question_ids: List[int]) -> models.Record:
+    """
+    Add a record together with its keyword, image and question links without committing,
+    so the caller can commit everything in one transaction.
+    """
+    db_record = models.Record(**record.dict())
+    db.add(db_record)
+    db.flush()
+
+    for keyword_id in dict.fromkeys(keyword_ids):
+        db.add(models.RecordKeyword(record_id=db_record.id, keyword_id=keyword_id))
+    db.add(models.Image(record_id=db_record.id, url=image_url))
+    for question_id in question_ids:
+        db.add(models.RecordQuestion(record_id=db_record.id, question_id=question_id))
+    return db_record
+
+
+# Record jobs
+def create_record_job(db: Session, elder_id: int, question_ids: List[int]) -> models.RecordJob:
+    """
+    Queue a background record creation job.
+    """
+    db_job = models.RecordJob(elder_id=elder_id, question_ids=json.dumps(question_ids))
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+
+def get_record_job_by_id(db: Session, job_id: int) -> Optional[models.RecordJob]:
+    """
+    Retrieve a record job by its ID.
+    """
+    return db.query(models.RecordJob).filter(models.RecordJob.id == job_id).first()
+
+
 # Questions
 def get_question_by_id(db: Session, question_id: int):
     """
@@ -113,6 +181,13 @@ def get_answers_by_question_ids(db: Session, elder_id: int, question_ids: list):
         .all()
     )
 
+def get_answer_by_id(db: Session, answer_id: int):
+    """
+    Retrieve an answer by its ID.
+    """
+    return db.query(models.Answer).filter(models.Answer.id == answer_id).first()
+
+
 def create_answer(db: Session, answer: schemas.AnswerCreate):
     """
     Create a new answer.
@@ -173,6 +248,18 @@ def get_all_activity_guides(db: Session):
     return db.query(models.ActivityGuide).all()
 
 
+def get_activity_guides_page(
+    db: Session, elder_id: Optional[int], page: PageParams, fields: Optional[Set[str]] = None
+) -> Tuple[List[models.ActivityGuide], Optional[str]]:
+    """
+    Retrieve a page of activity guides, newest first, reading only the requested fields.
+    """
+    query = _with_columns(db.query(models.ActivityGuide), models.ActivityGuide, fields)
+    if elder_id is not None:
+        query = query.filter(models.ActivityGuide.elder_id == elder_id)
+    return paginate(query, models.ActivityGuide, page)
+
+
 def get_activity_guides_by_record_ids(db: Session, record_ids: list):
     """
     Retrieve activity guides linked to specific record IDs.
@@ -268,6 +355,52 @@ def get_image_by_record_id(db: Session, record_id: int) -> Optional[str]:
     image = db.query(models.Image).filter(models.Image.record_id == record_id).first()
     return image.url if image else None
 
+def get_records_with_details(
+    db: Session,
+    elder_id: Optional[int] = None,
+    page: Optional[PageParams] = None,
+    fields: Optional[Set[str]] = None,
+) -> Tuple[List[models.Record], Optional[str]]:
+    """
+    Retrieve a page of records, newest first, with their images and keywords
+    loaded in two batched IN queries instead of two queries per record.
+    Use `record_image_url` and `record_keyword_list` to read them.
+
+    Args:
+        elder_id (int): Only this elder's records.
+        page (PageParams): Cursor, limit and date range; all records when omitted.
+        fields (Set[str]): Response fields to load; images and keywords are only
+            queried when requested.
+    Returns:
+        Tuple[List[models.Record], Optional[str]]: The records and the next page's cursor.
+    """
+    query = _with_columns(db.query(models.Record), models.Record, fields)
+    if fields is None or fields & {"image", "image_variants"}:
+        query = query.options(selectinload(models.Record.images))
+    if fields is None or "keywords" in fields:
+        query = query.options(
+            selectinload(models.Record.record_keywords).joinedload(models.RecordKeyword.keyword)
+        )
+    if elder_id is not None:
+        query = query.filter(models.Record.elder_id == elder_id)
+    return paginate(query, models.Record, page or PageParams(None, None, None, None, None))
+
+
+def record_image_url(record: models.Record) -> Optional[str]:
+    """
+    URL of a record's image (the first one saved) from its loaded images.
+    """
+    images = sorted(record.images, key=lambda image: image.id)
+    return images[0].url if images else None
+
+
+def record_keyword_list(record: models.Record) -> List[str]:
+    """
+    A record's keywords, in the order they were linked, from its loaded record_keywords.
+    """
+    return [record_keyword.keyword.keyword for record_keyword in sorted(record.record_keywords, key=lambda link: link.id)]
+
+
 def get_keywords_by_record_id(db: Session, record_id: int) -> List[str]:
     """
     Fetch the list of keywords for a record.
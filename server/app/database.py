@@ -19,6 +19,15 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Base class for declarative models
 Base = declarative_base()
 
+def create_tables():
+    """
+    Create missing tables for every model. Existing tables are left as they are.
+    """
+    from app import models  # Registers the models on Base.metadata
+
+    Base.metadata.create_all(bind=engine)
+
+
 # Dependency for database session
 def get_db():
     """
@@ -0,0 +1,364 @@
+"""
+Background record creation backed by the `record_jobs` table.
+
+`POST /records/?background=true` only inserts a queued job; a small pool of
+asyncio workers started with the app claims jobs from the table and runs the
+record pipeline. Every stage stores its result on the job row, so a job whose
+worker died (no heartbeat for RECORD_JOB_STALE_SECONDS) is put back in the
+queue and resumes after the last finished stage; a separate task looks for
+such jobs every RECORD_JOB_REAP_INTERVAL seconds. A running job's heartbeat
+is refreshed on a timer, however long a single stage takes.
+
+Claiming is a conditional UPDATE, so several app processes can share the
+same table. Each claim bumps `attempts`, and every later write of the worker
+only applies while the job is still running with the attempt it claimed, so
+a job that was requeued from under a slow worker is never saved twice.
+"""
+import os
+import json
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from app import crud, models, record_pipeline, schemas
+from app.database import SessionLocal
+
+# Worker pool size, idle polling interval and crash recovery settings
+RECORD_JOB_WORKERS = int(os.getenv("RECORD_JOB_WORKERS", "2"))
+RECORD_JOB_POLL_INTERVAL = float(os.getenv("RECORD_JOB_POLL_INTERVAL", "2"))
+RECORD_JOB_STALE_SECONDS = float(os.getenv("RECORD_JOB_STALE_SECONDS", "300"))
+RECORD_JOB_MAX_ATTEMPTS = int(os.getenv("RECORD_JOB_MAX_ATTEMPTS", "3"))
+# How often stale running jobs are looked for, however busy the queue is (seconds)
+RECORD_JOB_REAP_INTERVAL = float(os.getenv("RECORD_JOB_REAP_INTERVAL", "60"))
+# How often a worker refreshes the heartbeat of the job it runs (seconds)
+RECORD_JOB_HEARTBEAT_INTERVAL = float(os.getenv("RECORD_JOB_HEARTBEAT_INTERVAL", str(RECORD_JOB_STALE_SECONDS / 3)))
+
+logger = logging.getLogger(__name__)
+
+# Progress reported when a job enters each stage
+STAGE_PROGRESS = {
+    "queued": 0,
+    "drafting": 10,
+    "image": 50,
+    "saving": 90,
+    "done": 100,
+}
+
+
+class PermanentJobError(Exception):
+    """
+    A job failure that retrying cannot fix (e.g. the answers were deleted).
+    """
+
+
+class JobLostError(Exception):
+    """
+    The job was requeued or finished by someone else while this worker ran it.
+    """
+
+
+_wakeup: Optional[asyncio.Event] = None
+
+
+def _now() -> datetime:
+    return datetime.utcnow()
+
+
+async def enqueue_record_job(db, elder_id: int, question_ids: List[int]) -> models.RecordJob:
+    """
+    Queue a record creation job and wake an idle worker in this process.
+    """
+    job = await asyncio.to_thread(crud.create_record_job, db, elder_id=elder_id, question_ids=question_ids)
+    if _wakeup is not None:
+        _wakeup.set()
+    return job
+
+
+def requeue_stale_jobs() -> int:
+    """
+    Put running jobs whose worker stopped sending heartbeats back in the queue,
+    or fail them once they used up their attempts.
+
+    Returns:
+        int: Number of jobs recovered.
+    """
+    cutoff = _now() - timedelta(seconds=RECORD_JOB_STALE_SECONDS)
+    db = SessionLocal()
+    try:
+        stale_jobs = (
+            db.query(models.RecordJob)
+            .filter(models.RecordJob.status == "running", models.RecordJob.heartbeat_at < cutoff)
+            .all()
+        )
+        for job in stale_jobs:
+            if job.attempts >= RECORD_JOB_MAX_ATTEMPTS:
+                job.status = "failed"
+                job.error = "Worker stopped responding"
+            else:
+                job.status = "queued"
+        db.commit()
+        return len(stale_jobs)
+    finally:
+        db.close()
+
+
+def claim_next_job() -> Optional[Tuple[int, int]]:
+    """
+    Atomically move the oldest queued job to running.
+
+    Returns:
+        Optional[Tuple[int, int]]: ID and attempt number of the claimed job,
+        or None if the queue is empty.
+    """
+    db = SessionLocal()
+    try:
+        candidates = (
+            db.query(models.RecordJob.id, models.RecordJob.attempts)
+            .filter(models.RecordJob.status == "queued")
+            .order_by(models.RecordJob.id)
+            .limit(5)
+            .all()
+        )
+        for job_id, attempts in candidates:
+            claimed = (
+                db.query(models.RecordJob)
+                .filter(
+                    models.RecordJob.id == job_id,
+                    models.RecordJob.status == "queued",
+                    models.RecordJob.attempts == attempts,
+                )
+                .update({
+                    models.RecordJob.status: "running",
+                    models.RecordJob.attempts: attempts + 1,
+                    models.RecordJob.heartbeat_at: _now(),
+                    models.RecordJob.error: None,
+                }, synchronize_session=False)
+            )
+            db.commit()
+            if claimed:
+                return job_id, attempts + 1
+        return None
+    finally:
+        db.close()
+
+
+def _owned(query, job_id: int, attempt: int):
+    """
+    Restrict a job query to the run claimed as `attempt`.
+    """
+    return query.filter(
+        models.RecordJob.id == job_id,
+        models.RecordJob.status == "running",
+        models.RecordJob.attempts == attempt,
+    )
+
+
+def _update_job(job_id: int, attempt: int, **fields) -> bool:
+    """
+    Update job columns and refresh its heartbeat, as long as the job is still
+    running with this worker's attempt.
+
+    Returns:
+        bool: Whether the job was updated.
+    """
+    db = SessionLocal()
+    try:
+        values = {getattr(models.RecordJob, name): value for name, value in fields.items()}
+        values[models.RecordJob.heartbeat_at] = _now()
+        updated = _owned(db.query(models.RecordJob), job_id, attempt).update(values, synchronize_session=False)
+        db.commit()
+        return bool(updated)
+    finally:
+        db.close()
+
+
+def _checkpoint(job_id: int, attempt: int, **fields):
+    """
+    Store stage results on the job.
+
+    Raises:
+        JobLostError: When the job no longer belongs to this attempt.
+    """
+    if not _update_job(job_id, attempt, **fields):
+        raise JobLostError(f"Record job {job_id} was taken over after attempt {attempt}")
+
+
+def _enter_stage(job_id: int, attempt: int, stage: str, **fields):
+    _checkpoint(job_id, attempt, stage=stage, progress=STAGE_PROGRESS[stage], **fields)
+
+
+def _load_job(job_id: int) -> dict:
+    """
+    Read the job inputs and the checkpoints of finished stages.
+    """
+    db = SessionLocal()
+    try:
+        job = crud.get_record_job_by_id(db, job_id=job_id)
+        question_ids = json.loads(job.question_ids)
+        answers_with_questions = record_pipeline.load_answers(db, elder_id=job.elder_id, question_ids=question_ids)
+        return {
+            "elder_id": job.elder_id,
+            "draft": schemas.RecordDraft.model_validate_json(job.draft) if job.draft else None,
+            "image_url": job.image_url,
+            "combined_text": record_pipeline.combine_answers(answers_with_questions),
+        }
+    finally:
+        db.close()
+
+
+def _save_job_record(job_id: int, attempt: int, draft: schemas.RecordDraft, image_url: str):
+    """
+    Create the record and finish the job in the same transaction. Nothing is
+    saved when the job no longer belongs to this attempt.
+
+    Raises:
+        JobLostError: When another worker owns or finished the job.
+    """
+    db = SessionLocal()
+    try:
+        job = crud.get_record_job_by_id(db, job_id=job_id)
+        answers_with_questions = record_pipeline.load_answers(db, elder_id=job.elder_id, question_ids=json.loads(job.question_ids))
+        record = record_pipeline.add_record(db, job.elder_id, draft, image_url, answers_with_questions)
+        db.flush()
+        finished = _owned(db.query(models.RecordJob), job_id, attempt).update({
+            models.RecordJob.record_id: record.id,
+            models.RecordJob.status: "succeeded",
+            models.RecordJob.stage: "done",
+            models.RecordJob.progress: STAGE_PROGRESS["done"],
+            models.RecordJob.heartbeat_at: _now(),
+        }, synchronize_session=False)
+        if not finished:
+            raise JobLostError(f"Record job {job_id} was taken over after attempt {attempt}")
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def run_record_job(job_id: int, attempt: int):
+    """
+    Run the record pipeline for a claimed job, skipping stages whose result
+    was stored by an earlier attempt.
+    """
+    job = await asyncio.to_thread(_load_job, job_id)
+    if not job["combined_text"]:
+        raise PermanentJobError("No answers found for the provided questions")
+
+    draft = job["draft"]
+    if draft is None:
+        await asyncio.to_thread(_enter_stage, job_id, attempt, "drafting")
+        draft = await record_pipeline.generate_draft(job["combined_text"])
+        await asyncio.to_thread(_checkpoint, job_id, attempt, draft=draft.model_dump_json())
+
+    image_url = job["image_url"]
+    if image_url is None:
+        await asyncio.to_thread(_enter_stage, job_id, attempt, "image")
+        image_url = await record_pipeline.generate_record_image(draft.keywords)
+        await asyncio.to_thread(_checkpoint, job_id, attempt, image_url=image_url)
+
+    await asyncio.to_thread(_enter_stage, job_id, attempt, "saving")
+    await asyncio.to_thread(_save_job_record, job_id, attempt, draft, image_url)
+
+
+async def _keep_alive(job_id: int, attempt: int):
+    """
+    Refresh the job's heartbeat while a stage is running, so a long AI call
+    is not mistaken for a dead worker.
+    """
+    while True:
+        await asyncio.sleep(RECORD_JOB_HEARTBEAT_INTERVAL)
+        try:
+            if not await asyncio.to_thread(_update_job, job_id, attempt):
+                return
+        except Exception as e:
+            logger.error("Heartbeat of record job %s failed: %s", job_id, e)
+
+
+async def _run_claimed_job(job_id: int, attempt: int):
+    keep_alive = asyncio.create_task(_keep_alive(job_id, attempt))
+    try:
+        await run_record_job(job_id, attempt)
+    finally:
+        keep_alive.cancel()
+
+
+def _record_failure(job_id: int, attempt: int, error: Exception):
+    """
+    Requeue a failed job for another attempt, or mark it failed for good.
+    """
+    retry = not isinstance(error, PermanentJobError) and attempt < RECORD_JOB_MAX_ATTEMPTS
+    _update_job(job_id, attempt, status="queued" if retry else "failed", error=str(error))
+
+
+async def _worker(name: str):
+    """
+    Claim and run jobs until cancelled, sleeping while the queue is empty.
+    Errors outside a job (e.g. the database being briefly unreachable) are
+    logged and retried after RECORD_JOB_POLL_INTERVAL.
+    """
+    while True:
+        try:
+            claimed = await asyncio.to_thread(claim_next_job)
+            if claimed is None:
+                _wakeup.clear()
+                try:
+                    await asyncio.wait_for(_wakeup.wait(), timeout=RECORD_JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job_id, attempt = claimed
+            try:
+                await _run_claimed_job(job_id, attempt)
+            except asyncio.CancelledError:
+                # Shutting down: hand the job back so the next worker resumes it right away
+                await asyncio.to_thread(_update_job, job_id, attempt, status="queued")
+                raise
+            except JobLostError as e:
+                logger.warning("%s: %s", name, e)
+            except Exception as e:
+                logger.exception("%s: record job %s failed", name, job_id)
+                await asyncio.to_thread(_record_failure, job_id, attempt, e)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("%s: record job worker error", name)
+            await asyncio.sleep(RECORD_JOB_POLL_INTERVAL)
+
+
+async def _reaper():
+    """
+    Requeue jobs of dead workers on a fixed interval, so they are recovered
+    even while the queue never runs empty.
+    """
+    while True:
+        try:
+            recovered = await asyncio.to_thread(requeue_stale_jobs)
+        except Exception as e:
+            logger.error("Requeueing stale record jobs failed: %s", e)
+        else:
+            if recovered:
+                logger.warning("Recovered %s stale record job(s)", recovered)
+                _wakeup.set()
+        await asyncio.sleep(RECORD_JOB_REAP_INTERVAL)
+
+
+def start_record_job_workers(count: int = RECORD_JOB_WORKERS) -> List[asyncio.Task]:
+    """
+    Start the worker pool and the stale-job reaper on the running event loop.
+    """
+    global _wakeup
+    _wakeup = asyncio.Event()
+    workers = [asyncio.create_task(_worker(f"record-job-worker-{i}")) for i in range(count)]
+    return workers + [asyncio.create_task(_reaper())]
+
+
+async def stop_record_job_workers(workers: List[asyncio.Task]):
+    """
+    Cancel the worker pool and the reaper. Jobs interrupted here go back to the queue.
+    """
+    for worker in workers:
+        worker.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
@@ -1,14 +1,70 @@
-from fastapi import FastAPI
+import os
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from openai import RateLimitError
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import elders_router, questions_router, records_router, guides_router, answers_router, tasks_router, reports_router
-from app.database import Base, engine
-from fastapi.staticfiles import StaticFiles
+from app.routers import elders_router, questions_router, records_router, guides_router, answers_router, tasks_router, reports_router, stats_router
+from app.database import create_tables
+from app.jobs import start_record_job_workers, stop_record_job_workers
+from app.utils.static_files import ImmutableStaticFiles
+from app.metrics import instrument_app
+
+# Pre-render the random question bank in the background when the app starts
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+# Create missing tables when the app starts; turn off once `python -m app.cli init-db` runs at deploy time
+DB_CREATE_TABLES_ON_STARTUP = os.getenv("DB_CREATE_TABLES_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+# Level of the app's own log messages (uvicorn and libraries keep their own settings)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+
+def configure_logging():
+    """
+    Send the `app.*` loggers to stderr once, in the same format everywhere.
+    """
+    logger = logging.getLogger("app")
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        logger.addHandler(handler)
+    logger.setLevel(LOG_LEVEL)
+
+
+configure_logging()
+
+
+def _log_warmup_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception():
+        logging.getLogger("app.question_bank").error("Question bank warm-up failed: %s", task.exception())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application startup and shutdown hooks.
+    """
+    if DB_CREATE_TABLES_ON_STARTUP:
+        await asyncio.to_thread(create_tables)
+    warmup_task = None
+    if WARMUP_ON_STARTUP:
+        from app.question_bank import warm_up_question_bank
+        warmup_task = asyncio.create_task(warm_up_question_bank())
+        warmup_task.add_done_callback(_log_warmup_failure)
+    record_job_workers = start_record_job_workers()
+    yield
+    await stop_record_job_workers(record_job_workers)
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="샘",
     description="API for managing records, questions, lesson plans, and preferences for elderly care",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Enable CORS for all origins
@@ -18,10 +74,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all HTTP methods
     allow_headers=["*"],  # Allow all headers
+    expose_headers=["X-Next-Cursor"],  # Cursor of the next page of list endpoints
 )
-app.mount("/static", StaticFiles(directory="./static"), name="static")
-# Create database tables
-Base.metadata.create_all(bind=engine)
+
+
+@app.exception_handler(RateLimitError)
+async def rate_limit_error_handler(request: Request, exc: RateLimitError):
+    """
+    Provider still throttling after all retries: ask the client to come back later instead of a 500.
+    """
+    retry_after = exc.response.headers.get("retry-after") or "10"
+    return JSONResponse(status_code=503, content={"detail": "AI provider is busy, please retry shortly"}, headers={"Retry-After": retry_after})
+
+
+app.mount("/static", ImmutableStaticFiles(directory="./static"), name="static")
+instrument_app(app)
 
 # Include API routers
 app.include_router(elders_router, prefix="/elders", tags=["Elders"])
@@ -31,6 +98,7 @@ app.include_router(guides_router, prefix="/guides", tags=["Guides"])
 app.include_router(answers_router, prefix="/answers", tags=["Answers"])
 app.include_router(tasks_router, prefix="/tasks", tags=["Tasks"])
 app.include_router(reports_router, prefix="/reports", tags=["Reports"])
+app.include_router(stats_router, prefix="/stats", tags=["Stats"])
 # Root endpoint
 @app.get("/", tags=["Root"])
 def root():
@@ -0,0 +1,218 @@
+"""
+Prometheus metrics, exposed at /metrics.
+
+- HTTP request counts and latency per route (prometheus-fastapi-instrumentator)
+- latency of every AI call by function, provider, model and outcome
+- prompt/completion tokens reported by the providers
+- seconds of audio sent for transcription
+- latency of each record-creation stage and structured-draft fallbacks
+- database connection pool usage
+"""
+import time
+import asyncio
+import inspect
+import functools
+from typing import Optional
+from prometheus_client import Counter, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import REGISTRY, Collector
+from sqlalchemy.pool import QueuePool
+
+AI_CALL_SECONDS = Histogram(
+    "ai_call_duration_seconds",
+    "Latency of AI provider calls.",
+    ["function", "provider", "model", "outcome"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120),
+)
+AI_TOKENS = Counter(
+    "ai_tokens_total",
+    "Tokens reported by AI providers.",
+    ["provider", "model", "kind"],
+)
+AUDIO_TRANSCRIBED_SECONDS = Counter(
+    "ai_audio_transcribed_seconds_total",
+    "Seconds of audio sent for transcription.",
+    ["provider", "model"],
+)
+RECORD_DRAFT_FALLBACKS = Counter(
+    "record_draft_fallbacks_total",
+    "Record drafts generated with separate calls because structured output was unsupported.",
+    ["reason"],
+)
+RECORD_STAGE_SECONDS = Histogram(
+    "record_stage_duration_seconds",
+    "Latency of each record-creation stage.",
+    ["stage", "outcome"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120),
+)
+
+
+def _call_labels(task: Optional[str], provider: Optional[str], model: Optional[str]):
+    if task is not None:
+        from app.utils.providers import providers
+        config = providers.config(task)
+        return provider or config.provider, model or config.model
+    return provider or "unknown", model or "unknown"
+
+
+def observe_ai_call(task: Optional[str] = None, provider: Optional[str] = None, model: Optional[str] = None):
+    """
+    Decorator recording the latency and outcome of an AI call. For streaming
+    calls (async generators) the latency runs until the stream ends; a stream
+    the caller stops reading counts as cancelled.
+
+    Args:
+        task (str): Provider task whose provider and model label the call (e.g. "summary").
+        provider (str): Provider label for calls outside the task registry (e.g. "elice").
+        model (str): Model label for calls outside the task registry.
+    """
+    def decorator(function):
+        def observe(started: float, outcome: str):
+            call_provider, call_model = _call_labels(task, provider, model)
+            AI_CALL_SECONDS.labels(function.__name__, call_provider, call_model, outcome).observe(time.perf_counter() - started)
+
+        if inspect.isasyncgenfunction(function):
+            @functools.wraps(function)
+            async def stream_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                stream = function(*args, **kwargs)
+                try:
+                    async for item in stream:
+                        yield item
+                except (asyncio.CancelledError, GeneratorExit):
+                    observe(started, "cancelled")
+                    raise
+                except Exception:
+                    observe(started, "error")
+                    raise
+                finally:
+                    await stream.aclose()
+                observe(started, "success")
+            return stream_wrapper
+
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = await function(*args, **kwargs)
+            except asyncio.CancelledError:
+                observe(started, "cancelled")
+                raise
+            except Exception:
+                observe(started, "error")
+                raise
+            observe(started, "success")
+            return result
+        return wrapper
+    return decorator
+
+
+def observe_record_stage(stage: str):
+    """
+    Decorator recording the latency of a record-creation stage.
+    """
+    def decorator(function):
+        if asyncio.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                outcome = "error"
+                try:
+                    result = await function(*args, **kwargs)
+                    outcome = "success"
+                    return result
+                finally:
+                    RECORD_STAGE_SECONDS.labels(stage, outcome).observe(time.perf_counter() - started)
+        else:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                outcome = "error"
+                try:
+                    result = function(*args, **kwargs)
+                    outcome = "success"
+                    return result
+                finally:
+                    RECORD_STAGE_SECONDS.labels(stage, outcome).observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def record_token_usage(provider: str, body: dict):
+    """
+    Count the tokens in the `usage` block of a provider response body.
+    """
+    usage = body.get("usage") if isinstance(body, dict) else None
+    if not isinstance(usage, dict):
+        return
+    model = body.get("model") or "unknown"
+    for kind, field in (("prompt", "prompt_tokens"), ("completion", "completion_tokens")):
+        if usage.get(field):
+            AI_TOKENS.labels(provider, model, kind).inc(usage[field])
+
+
+def async_token_usage_hook(provider: str):
+    """
+    httpx response hook counting the tokens of JSON provider responses.
+    Streamed and binary responses are left alone.
+    """
+    async def hook(response):
+        if response.headers.get("content-type", "").startswith("application/json"):
+            await response.aread()
+            record_token_usage(provider, _json_or_none(response))
+    return hook
+
+
+def _json_or_none(response):
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+
+def record_audio_seconds(provider: str, model: str, seconds: Optional[float]):
+    """
+    Count seconds of audio sent for transcription, when the duration is known.
+    """
+    if seconds:
+        AUDIO_TRANSCRIBED_SECONDS.labels(provider, model).inc(seconds)
+
+
+class DatabasePoolCollector(Collector):
+    """
+    Connection pool gauges of the SQLAlchemy engine, read at scrape time.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def collect(self):
+        pool = self.engine.pool
+        # Only QueuePool has these counters; e.g. SQLite's SingletonThreadPool has an int `size`
+        if not isinstance(pool, QueuePool):
+            return
+        for name, method, documentation in (
+            ("db_pool_size", "size", "Configured connection pool size."),
+            ("db_pool_checked_out", "checkedout", "Connections currently in use."),
+            ("db_pool_checked_in", "checkedin", "Idle connections in the pool."),
+            ("db_pool_overflow", "overflow", "Connections open beyond the pool size."),
+        ):
+            yield GaugeMetricFamily(name, documentation, value=getattr(pool, method)())
+
+
+_pool_collector: Optional[DatabasePoolCollector] = None
+
+
+def instrument_app(app):
+    """
+    Add per-route HTTP metrics and the database pool gauges, and expose /metrics.
+    The pool collector is registered once per process, however often this runs.
+    """
+    global _pool_collector
+    from prometheus_fastapi_instrumentator import Instrumentator
+    from app.database import engine
+
+    if _pool_collector is None:
+        _pool_collector = DatabasePoolCollector(engine)
+        REGISTRY.register(_pool_collector)
+    Instrumentator(excluded_handlers=["/metrics"]).instrument(app).expose(app, include_in_schema=False)
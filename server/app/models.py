@@ -212,3 +212,24 @@ class Report(Base):
 
     # Relationships
     analyses = relationship("Analysis", back_populates="report")
+
+
+class RecordJob(Base):
+    """
+    Background record creation jobs
+    """
+    __tablename__ = "record_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    elder_id = Column(Integer, ForeignKey("elders.id"), nullable=False)
+    question_ids = Column(Text, nullable=False)  # JSON list of question IDs
+    status = Column(Enum("queued", "running", "succeeded", "failed"), nullable=False, default="queued", index=True)
+    stage = Column(String(50), nullable=False, default="queued")
+    progress = Column(Integer, nullable=False, default=0)  # 0-100
+    attempts = Column(Integer, nullable=False, default=0)
+    draft = Column(Text, nullable=True)  # Generated RecordDraft JSON, kept so a resumed job skips the LLM call
+    image_url = Column(Text, nullable=True)  # Generated image, kept so a resumed job skips image generation
+    record_id = Column(Integer, ForeignKey("records.id"), nullable=True)
+    error = Column(Text, nullable=True)
+    heartbeat_at = Column(TIMESTAMP, nullable=True)  # Last progress update of the worker running the job
+    created_at = Column(TIMESTAMP, server_default="CURRENT_TIMESTAMP")
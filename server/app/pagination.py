@@ -0,0 +1,178 @@
+"""
+Keyset pagination, filters and field projection for list endpoints.
+
+List endpoints return rows newest first (by id, which follows created_at).
+Without `limit` they return every row, as they did before pagination existed
+(unless DEFAULT_PAGE_SIZE is set). A page holds at most `limit` rows. When
+there are more, the response carries an `X-Next-Cursor` header; pass it back
+as `cursor` to get the next page.
+Each page is a `WHERE id < :cursor ORDER BY id DESC LIMIT n` range scan on
+the primary key, so its cost does not grow with the table the way OFFSET does.
+
+`created_after` / `created_before` restrict rows by creation time, and
+`fields=id,title,created_at` returns only the listed fields, validated and
+serialized by the matching fields of the response schema. Columns not
+requested are not read from the database.
+"""
+import os
+import json
+import base64
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import FrozenSet, Iterable, Optional, Set, Tuple, Type
+from fastapi import HTTPException, Query, Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ConfigDict, create_model
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only
+
+# Page size when `limit` is not given (unset: every row), and the largest one allowed
+DEFAULT_PAGE_SIZE = int(os.environ["DEFAULT_PAGE_SIZE"]) if os.getenv("DEFAULT_PAGE_SIZE") else None
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "200"))
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: int) -> str:
+    """
+    Opaque cursor pointing after the row with `last_id`.
+    """
+    return base64.urlsafe_b64encode(json.dumps({"id": last_id}).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Row id a cursor points after.
+
+    Raises:
+        HTTPException: 400 when the cursor was not produced by `encode_cursor`.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return int(payload["id"])
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@dataclass
+class PageParams:
+    """
+    Pagination, date-range and projection query parameters of a list request.
+    """
+    cursor: Optional[int]
+    limit: Optional[int]
+    created_after: Optional[datetime]
+    created_before: Optional[datetime]
+    fields: Optional[str]
+
+    def select(self, schema) -> Optional[Set[str]]:
+        """
+        Requested fields of the response schema (always including `id`), or
+        None when all fields are wanted.
+
+        Raises:
+            HTTPException: 400 for fields the schema does not have.
+        """
+        if not self.fields:
+            return None
+        requested = {field.strip() for field in self.fields.split(",") if field.strip()}
+        unknown = requested - set(schema.model_fields)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        return requested | {"id"}
+
+    @property
+    def filtered(self) -> bool:
+        return self.cursor is not None or self.created_after is not None or self.created_before is not None
+
+
+def page_params(default_limit: Optional[int] = DEFAULT_PAGE_SIZE):
+    """
+    Dependency that reads `PageParams` from the query string.
+
+    Args:
+        default_limit (int): Page size when `limit` is omitted; None (the default
+            unless DEFAULT_PAGE_SIZE is set) returns every row.
+    """
+    def dependency(
+        cursor: Optional[str] = Query(None, description=f"Value of the previous page's {NEXT_CURSOR_HEADER} header"),
+        limit: Optional[int] = Query(default_limit, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of rows; all rows when omitted"),
+        created_after: Optional[datetime] = Query(None, description="Only rows created at or after this time"),
+        created_before: Optional[datetime] = Query(None, description="Only rows created before this time"),
+        fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,created_at; items then hold only these fields"),
+    ) -> PageParams:
+        return PageParams(
+            cursor=decode_cursor(cursor) if cursor else None,
+            limit=limit,
+            created_after=created_after,
+            created_before=created_before,
+            fields=fields,
+        )
+    return dependency
+
+
+def load_columns(model, fields: Optional[Set[str]]):
+    """
+    Query options that read only the requested columns (plus the primary key),
+    or None when all fields are wanted.
+    """
+    if fields is None:
+        return None
+    columns = {column.key for column in inspect(model).column_attrs}
+    return load_only(*(getattr(model, name) for name in sorted((fields & columns) | {"id"})))
+
+
+def paginate(query, model, page: PageParams) -> Tuple[list, Optional[str]]:
+    """
+    Apply the date range and cursor to a query and fetch one page, newest first.
+
+    Returns:
+        Tuple[list, Optional[str]]: The rows, and the cursor of the next page
+        (None on the last page).
+    """
+    if page.created_after is not None:
+        query = query.filter(model.created_at >= page.created_after)
+    if page.created_before is not None:
+        query = query.filter(model.created_at < page.created_before)
+    if page.cursor is not None:
+        query = query.filter(model.id < page.cursor)
+    query = query.order_by(model.id.desc())
+    if page.limit is None:
+        return query.all(), None
+
+    # One extra row tells whether another page exists
+    rows = query.limit(page.limit + 1).all()
+    if len(rows) > page.limit:
+        return rows[:page.limit], encode_cursor(rows[page.limit - 1].id)
+    return rows, None
+
+
+@lru_cache(maxsize=128)
+def projection_schema(schema: Type[BaseModel], fields: FrozenSet[str]) -> Type[BaseModel]:
+    """
+    Model with only the given fields of a response schema, same types and defaults.
+    """
+    return create_model(
+        f"{schema.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (info.annotation, info) for name, info in schema.model_fields.items() if name in fields},
+    )
+
+
+def page_response(response: Response, schema: Type[BaseModel], items: Iterable, next_cursor: Optional[str], fields: Optional[Set[str]]):
+    """
+    Return a page from a list endpoint: set the next-page header and, with a
+    field projection, validate and serialize each item with only the requested
+    fields of `schema`.
+    """
+    if fields is None:
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return items
+
+    # The endpoint's response_model would reject the missing fields, so the projection is serialized here
+    projection = projection_schema(schema, frozenset(fields))
+    projected = [projection.model_validate(item).model_dump(mode="json") for item in items]
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return JSONResponse(content=projected, headers=headers)
@@ -0,0 +1,98 @@
+import os
+import asyncio
+import logging
+from app import crud, schemas
+from app.database import SessionLocal
+from app.utils.async_openai_client import generate_tts_openai
+
+logger = logging.getLogger(__name__)
+
+# Number of TTS renders that may run at once during warm-up
+WARMUP_CONCURRENCY = int(os.getenv("WARMUP_CONCURRENCY", "4"))
+
+# 기록을 시작할 때 제공하는 노인 친화적 랜덤 질문
+RANDOM_QUESTIONS = [
+    "안녕하세요, 오늘 기분은 어떠신가요?",
+    "오늘 아침에 드신 음식이 기억나시나요?",
+    "최근에 기억에 남는 일이 있으신가요?",
+    "오늘 특별히 생각나는 분이 계신가요?",
+    "좋아하는 노래가 있다면 어떤 곡인가요?",
+    "예전에 가봤던 가장 기억에 남는 장소가 어디인가요?",
+    "젊었을 때 하던 취미가 있으셨나요?",
+    "오늘은 무엇을 하며 하루를 보내셨나요?",
+    "요즘 자주 드는 생각이 있다면 무엇인가요?",
+    "가족 중에서 최근에 연락한 사람이 있나요?",
+    "요즘 보고 싶은 사람이 있으신가요?",
+    "오늘은 무엇을 먹고 싶으신가요?",
+    "예전에 즐겨보셨던 영화나 드라마가 있으신가요?",
+    "좋아하는 계절이 있다면 어떤 계절인가요?",
+    "건강을 위해 요즘 어떤 노력을 하고 계신가요?",
+    "친구나 지인들과 어떤 이야기를 나누고 싶으신가요?",
+    "가장 좋아하는 추억이 있다면 공유해 주시겠어요?",
+    "오늘 마주한 재미있는 일이 있었나요?",
+    "어릴 적 자주 가던 곳이 떠오르시나요?",
+    "요즘 취미로 즐기고 계신 것이 있나요?",
+    "예전과 달라진 점이 있다면 무엇인가요?",
+    "오늘은 어떤 이야기를 하고 싶으신가요?",
+    "주변 사람들에게 감사하고 싶은 일이 있으신가요?",
+    "오늘 특별히 기쁜 일이 있었나요?",
+    "요즘 관심이 가는 것이 있다면 무엇인가요?",
+    "가장 좋아하는 음식이 무엇인지 말씀해 주시겠어요?",
+    "어떤 꿈을 꾸셨는지 기억나시나요?",
+    "요즘 자주 생각나는 풍경이 있나요?",
+    "어린 시절 자주 하던 놀이가 있었나요?",
+    "오늘 하루가 어땠는지 말씀해 주세요."
+]
+
+
+def ensure_question_rows() -> int:
+    """
+    Make sure every prompt in the bank exists as a `Question` row.
+
+    Returns:
+        int: Number of rows created.
+    """
+    db = SessionLocal()
+    try:
+        created = 0
+        for text in RANDOM_QUESTIONS:
+            if not crud.get_question_by_text(db, text=text):
+                crud.create_question(db, question=schemas.QuestionCreate(text=text))
+                created += 1
+        return created
+    finally:
+        db.close()
+
+
+async def warm_up_question_bank(concurrency: int = WARMUP_CONCURRENCY) -> dict:
+    """
+    Pre-render TTS audio for every prompt in the bank so the first question
+    of a session plays from the TTS cache.
+
+    Args:
+        concurrency (int): Maximum number of TTS calls in flight.
+    Returns:
+        dict: Counts of created rows, rendered prompts and failures.
+    """
+    created = await asyncio.to_thread(ensure_question_rows)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def render(text: str):
+        async with semaphore:
+            return await generate_tts_openai(text)
+
+    results = await asyncio.gather(*(render(text) for text in RANDOM_QUESTIONS), return_exceptions=True)
+    failures = [
+        (text, result) for text, result in zip(RANDOM_QUESTIONS, results) if isinstance(result, Exception)
+    ]
+    for text, error in failures:
+        logger.warning("Warm-up TTS failed for %r: %s", text, error)
+
+    result = {
+        "questions": len(RANDOM_QUESTIONS),
+        "created": created,
+        "rendered": len(RANDOM_QUESTIONS) - len(failures),
+        "failed": len(failures),
+    }
+    logger.info("Question bank warm-up finished: %s", result)
+    return result
@@ -0,0 +1,101 @@
+"""
+Steps of creating today's record, shared by `POST /records/` and the
+background record jobs in `app.jobs`.
+"""
+import asyncio
+import logging
+from typing import List, Tuple
+from openai import BadRequestError
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from app import crud, models, schemas
+from app.metrics import RECORD_DRAFT_FALLBACKS, observe_record_stage
+from app.utils.image_variants import variant_urls
+from app.utils.async_openai_client import summarize_text, generate_title, extract_keywords, generate_record_draft, generate_image_for_keywords
+
+logger = logging.getLogger(__name__)
+
+
+def load_answers(db: Session, elder_id: int, question_ids: List[int]) -> List[Tuple[models.Answer, str]]:
+    """
+    Fetch the elder's answers to the given questions, with the question text.
+    """
+    return crud.get_answers_by_question_ids(db, elder_id=elder_id, question_ids=question_ids)
+
+
+def combine_answers(answers_with_questions: List[Tuple[models.Answer, str]]) -> str:
+    """
+    Combine answers into a single Q/A text.
+    """
+    return "\n".join([
+        f"Q: {question_text}\nA: {answer.response}"
+        for answer, question_text in answers_with_questions
+    ])
+
+
+@observe_record_stage("draft")
+async def generate_draft(combined_text: str) -> schemas.RecordDraft:
+    """
+    Generate summary, title and keywords in one structured-output request.
+    Providers that reject the JSON schema or answer with something that does
+    not parse get one request per field instead. Other failures (rate limits,
+    timeouts, outages) are raised, since more calls would not help.
+    """
+    try:
+        return await generate_record_draft(combined_text)
+    except (BadRequestError, ValidationError) as e:
+        reason = "rejected" if isinstance(e, BadRequestError) else "unparsable"
+        RECORD_DRAFT_FALLBACKS.labels(reason).inc()
+        logger.warning("Structured record draft %s, falling back to separate calls: %s", reason, e)
+        summary = await summarize_text(combined_text)
+        title, keywords = await asyncio.gather(
+            generate_title(summary),
+            extract_keywords(summary),
+        )
+        return schemas.RecordDraft(summary=summary, title=title, keywords=keywords)
+
+
+@observe_record_stage("image")
+async def generate_record_image(keywords: List[str]) -> str:
+    """
+    Generate the record image from its keywords and save it locally, or reuse
+    an image generated for the same keyword set.
+    """
+    return await generate_image_for_keywords(keywords)
+
+
+@observe_record_stage("saving")
+def add_record(db: Session, elder_id: int, draft: schemas.RecordDraft, image_path: str, answers_with_questions: List[Tuple[models.Answer, str]]) -> models.Record:
+    """
+    Add the record with its keywords, image and questions to the session.
+    The caller commits.
+    """
+    keyword_ids = [crud.create_or_get_keyword(db, keyword=keyword).id for keyword in draft.keywords]
+    record_data = schemas.RecordCreate(
+        title=draft.title,
+        content=draft.summary,
+        elder_id=elder_id,
+    )
+    return crud.add_record_with_details(
+        db,
+        record=record_data,
+        keyword_ids=keyword_ids,
+        image_url=image_path,
+        question_ids=[answer.question_id for answer, question_text in answers_with_questions],
+    )
+
+
+def record_response(record: models.Record, image_path: str, keywords: List[str]) -> dict:
+    """
+    Response body for a created record, including the image and keywords.
+    """
+    return {
+        "id": record.id,
+        "elder_id": record.elder_id,
+        "title": record.title,
+        "content": record.content,
+        "created_at": record.created_at,
+        "image": image_path,  # Return the local image path
+        "image_variants": variant_urls(image_path),
+        "keywords": keywords  # Return the list of keywords
+    }
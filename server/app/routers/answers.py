@@ -1,12 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, Form
+from fastapi import APIRouter, Depends, HTTPException, Response, UploadFile, Form
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app import schemas, crud, database, models
-from app.utils.openai_client import transcribe_audio
+from app.pagination import PageParams, page_params, page_response
+from app.utils.async_openai_client import transcribe_audio
+from app.utils.openai_client import cached_transcription
+from app.utils.audio_upload import spooled_audio
+from app.utils.audio_preprocess import normalize_audio
 import os
-import uuid
+import asyncio
+import logging
 import datetime
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+async def _transcribe_upload(audio: UploadFile) -> str:
+    """
+    Spool an uploaded recording to a temp file in chunks, normalize and transcribe it.
+    The temp files are removed whether or not transcription succeeds.
+    """
+    async with spooled_audio(audio) as spooled:
+        logger.debug("Saved audio upload %s (%s bytes) to %s", spooled.filename, spooled.size, spooled.path)
+
+        # Retried uploads of the same recording reuse the earlier transcription
+        cached = await asyncio.to_thread(cached_transcription, spooled.sha256)
+        if cached is not None:
+            return cached
+
+        # Downmix, resample and trim the recording before uploading it
+        normalized = await asyncio.to_thread(normalize_audio, spooled.path)
+        try:
+            return await transcribe_audio(normalized.path, audio_sha256=spooled.sha256)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Audio transcription failed: {str(e)}")
+        finally:
+            if normalized.changed:
+                os.remove(normalized.path)
 
 @router.post("/manual", response_model=schemas.Answer)
 def save_manual_answer(
@@ -31,24 +61,25 @@ def save_manual_answer(
     return new_answer
 
 @router.get("/", response_model=List[schemas.Answer])
-def get_all_answers(db: Session = Depends(database.get_db)):
+def get_all_answers(
+    response: Response,
+    elder_id: Optional[int] = None,
+    page: PageParams = Depends(page_params()),
+    db: Session = Depends(database.get_db),
+):
     """
-    Retrieve all answers from the database.
+    Retrieve answers from the database, newest first.
+    All of them are returned unless `limit` is given; pass the `X-Next-Cursor` header back as `cursor` for the next page.
     """
-    answers = db.query(models.Answer).all()
-    if not answers:
+    fields = page.select(schemas.Answer)
+    answers, next_cursor = crud.get_answers_page(db, elder_id=elder_id, page=page, fields=fields)
+    if not answers and not page.filtered and elder_id is None:
         raise HTTPException(status_code=404, detail="No answers found")
-    return answers
+    return page_response(response, schemas.Answer, answers, next_cursor, fields)
 
-@router.post("/", response_model=schemas.Answer)
-async def save_audio_answer(
-    elder_id: int = Form(...),
-    question_id: int = Form(...),
-    audio: UploadFile = Form(...),
-    db: Session = Depends(database.get_db),
-):
+def _validate_answer_target(db: Session, elder_id: int, question_id: int):
     """
-    Save an audio answer to the database.
+    Raise 404 unless both the elder and the question exist.
     """
     # Validate elder
     elder = crud.get_elder_by_id(db, elder_id=elder_id)
@@ -60,25 +91,31 @@ async def save_audio_answer(
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
 
-    # Generate a unique file name to avoid collisions
-    unique_filename = f"{uuid.uuid4()}_{audio.filename}"
-    audio_file_path = os.path.join("/tmp", unique_filename)
-    print(f"Saving audio file to {audio_file_path}")
 
-    # Save the uploaded audio temporarily
-    with open(audio_file_path, "wb") as f:
-        content = await audio.read()
-        f.write(content)
+def _update_answer_response(db: Session, answer: models.Answer, transcription: str):
+    """
+    Replace an answer's response with a new transcription dated today.
+    """
+    answer.response = transcription
+    answer.response_date = datetime.date.today()
+    db.commit()
+    db.refresh(answer)
 
-    # Transcribe audio using OpenAI Whisper
-    try:
-        transcription = transcribe_audio(audio_file_path)
-    except Exception as e:
-        os.remove(audio_file_path)  # Clean up the temp file
-        raise HTTPException(status_code=500, detail=f"Audio transcription failed: {str(e)}")
 
-    # Clean up the audio file after transcription
-    os.remove(audio_file_path)
+@router.post("/", response_model=schemas.Answer)
+async def save_audio_answer(
+    elder_id: int = Form(...),
+    question_id: int = Form(...),
+    audio: UploadFile = Form(...),
+    db: Session = Depends(database.get_db),
+):
+    """
+    Save an audio answer to the database.
+    """
+    await asyncio.to_thread(_validate_answer_target, db, elder_id, question_id)
+
+    # Transcribe audio using OpenAI Whisper
+    transcription = await _transcribe_upload(audio)
 
     # Save the transcription as an answer in the database
     answer_data = schemas.AnswerCreate(
@@ -87,7 +124,7 @@ async def save_audio_answer(
         response=transcription,
         response_date=schemas.date.today(),
     )
-    new_answer = crud.create_answer(db, answer=answer_data)
+    new_answer = await asyncio.to_thread(crud.create_answer, db, answer=answer_data)
 
     return new_answer
 
@@ -117,34 +154,14 @@ async def re_answer(
     Update the response of an existing answer with a new audio file.
     """
     # Fetch the existing answer
-    existing_answer = db.query(models.Answer).filter(models.Answer.id == answer_id).first()
+    existing_answer = await asyncio.to_thread(crud.get_answer_by_id, db, answer_id=answer_id)
     if not existing_answer:
         raise HTTPException(status_code=404, detail="Answer not found")
 
-    # Generate a unique file name to avoid collisions
-    unique_filename = f"{uuid.uuid4()}_{audio.filename}"
-    audio_file_path = os.path.join("/tmp", unique_filename)
-    print(f"Saving audio file to {audio_file_path}")
-
-    # Save the uploaded audio temporarily
-    with open(audio_file_path, "wb") as f:
-        content = await audio.read()
-        f.write(content)
-
     # Transcribe audio using OpenAI Whisper
-    try:
-        transcription = transcribe_audio(audio_file_path)
-    except Exception as e:
-        os.remove(audio_file_path)  # Clean up the temp file
-        raise HTTPException(status_code=500, detail=f"Audio transcription failed: {str(e)}")
-
-    # Clean up the audio file after transcription
-    os.remove(audio_file_path)
+    transcription = await _transcribe_upload(audio)
 
     # Update the response of the existing answer
-    existing_answer.response = transcription
-    existing_answer.response_date = datetime.date.today()
-    db.commit()
-    db.refresh(existing_answer)
+    await asyncio.to_thread(_update_answer_response, db, existing_answer, transcription)
 
     return existing_answer
\ No newline at end of file
@@ -1,19 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app import schemas, crud, database, models
+from app.pagination import PageParams, page_params, page_response
 
 router = APIRouter()
 
 @router.get("/", response_model=List[schemas.ActivityGuide])
-def get_all_guides(db: Session = Depends(database.get_db)):
+def get_all_guides(
+    response: Response,
+    elder_id: Optional[int] = None,
+    page: PageParams = Depends(page_params()),
+    db: Session = Depends(database.get_db),
+):
     """
-    Retrieve all activity guides.
+    Retrieve activity guides, newest first.
+    All of them are returned unless `limit` is given; pass the `X-Next-Cursor` header back as `cursor` for the next page.
     """
-    guides = crud.get_all_activity_guides(db)
-    if not guides:
+    fields = page.select(schemas.ActivityGuide)
+    guides, next_cursor = crud.get_activity_guides_page(db, elder_id=elder_id, page=page, fields=fields)
+    if not guides and not page.filtered and elder_id is None:
         raise HTTPException(status_code=404, detail="No activity guides found")
-    return guides
+    return page_response(response, schemas.ActivityGuide, guides, next_cursor, fields)
 
 
 @router.post("/create_with_questions", response_model=schemas.ActivityGuide)
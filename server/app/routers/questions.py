@@ -1,9 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from typing import List
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from app import schemas, crud, database, models
-from app.utils.openai_client import generate_follow_up_question, generate_tts, generate_tts_openai
+from app.utils.async_openai_client import (
+    generate_follow_up_question,
+    stream_follow_up_question,
+    generate_question_tts,
+    cached_tts_openai,
+    stream_tts_openai,
+)
+from app.pagination import PageParams, page_params, page_response
+from app.utils.sse import SSE_HEADERS, format_sse
+from app.question_bank import RANDOM_QUESTIONS
 router = APIRouter()
 
 
@@ -41,14 +51,19 @@ def add_question(
 
 
 @router.get("/", response_model=List[schemas.Question])
-def get_all_questions(db: Session = Depends(database.get_db)):
+def get_all_questions(
+    response: Response,
+    page: PageParams = Depends(page_params()),
+    db: Session = Depends(database.get_db),
+):
     """
-    모든 질문 받아오기
+    질문 목록 받아오기 (최신순; `limit`을 주면 그 개수씩, 다음 페이지는 `X-Next-Cursor` 헤더 값을 `cursor`로 전달)
     """
-    questions = db.query(models.Question).all()
-    if not questions:
+    fields = page.select(schemas.Question)
+    questions, next_cursor = crud.get_questions_page(db, page=page, fields=fields)
+    if not questions and not page.filtered:
         raise HTTPException(status_code=404, detail="No questions found")
-    return questions
+    return page_response(response, schemas.Question, questions, next_cursor, fields)
 
 
 @router.get("/{question_id}", response_model=schemas.Question)
@@ -83,58 +98,16 @@ def add_random_question(db: Session = Depends(database.get_db)):
     """
     기록을 시작할 때 제공하는 노인 친화적 랜덤 질문 제공
     """
-    random_questions = [
-        "안녕하세요, 오늘 기분은 어떠신가요?",
-        "오늘 아침에 드신 음식이 기억나시나요?",
-        "최근에 기억에 남는 일이 있으신가요?",
-        "오늘 특별히 생각나는 분이 계신가요?",
-        "좋아하는 노래가 있다면 어떤 곡인가요?",
-        "예전에 가봤던 가장 기억에 남는 장소가 어디인가요?",
-        "젊었을 때 하던 취미가 있으셨나요?",
-        "오늘은 무엇을 하며 하루를 보내셨나요?",
-        "요즘 자주 드는 생각이 있다면 무엇인가요?",
-        "가족 중에서 최근에 연락한 사람이 있나요?",
-        "요즘 보고 싶은 사람이 있으신가요?",
-        "오늘은 무엇을 먹고 싶으신가요?",
-        "예전에 즐겨보셨던 영화나 드라마가 있으신가요?",
-        "좋아하는 계절이 있다면 어떤 계절인가요?",
-        "건강을 위해 요즘 어떤 노력을 하고 계신가요?",
-        "친구나 지인들과 어떤 이야기를 나누고 싶으신가요?",
-        "가장 좋아하는 추억이 있다면 공유해 주시겠어요?",
-        "오늘 마주한 재미있는 일이 있었나요?",
-        "어릴 적 자주 가던 곳이 떠오르시나요?",
-        "요즘 취미로 즐기고 계신 것이 있나요?",
-        "예전과 달라진 점이 있다면 무엇인가요?",
-        "오늘은 어떤 이야기를 하고 싶으신가요?",
-        "주변 사람들에게 감사하고 싶은 일이 있으신가요?",
-        "오늘 특별히 기쁜 일이 있었나요?",
-        "요즘 관심이 가는 것이 있다면 무엇인가요?",
-        "가장 좋아하는 음식이 무엇인지 말씀해 주시겠어요?",
-        "어떤 꿈을 꾸셨는지 기억나시나요?",
-        "요즘 자주 생각나는 풍경이 있나요?",
-        "어린 시절 자주 하던 놀이가 있었나요?",
-        "오늘 하루가 어땠는지 말씀해 주세요."
-    ]
-
     from random import choice
-    random_text = choice(random_questions)
+    random_text = choice(RANDOM_QUESTIONS)
 
     
     question_data = schemas.QuestionCreate(text=random_text)
     return crud.create_question(db, question=question_data)
 
-@router.post(
-    "/generate_follow_up",
-    response_model=schemas.GenerateFollowUpResponse,
-    summary="Generate a Follow-Up Question",
-    description="Generate a meaningful follow-up question for an elder using provided question IDs."
-)
-def generate_follow_up_question_api(
-    input_data: schemas.GenerateFollowUpInput,  # Input schema
-    db: Session = Depends(database.get_db),
-):
+def _get_question_answer_pairs(input_data: schemas.GenerateFollowUpInput, db: Session) -> List[dict]:
     """
-    Generate a follow-up question for an elder using provided question IDs.
+    Validate the follow-up input and collect its question-answer pairs.
     """
     # Validate elder existence
     elder = crud.get_elder_by_id(db, elder_id=input_data.elder_id)
@@ -151,17 +124,43 @@ def generate_follow_up_question_api(
         )
 
     # Prepare data for OpenAI
-    question_answer_pairs = [
+    return [
         {"question": question_text, "answer": answer.response}
         for answer, question_text in answers_with_questions
     ]
 
+def _save_question(text: str) -> int:
+    """
+    Save a question with a fresh session (the request's session is closed
+    once a streaming response starts) and return its ID.
+    """
+    db = database.SessionLocal()
+    try:
+        return crud.create_question(db, question=schemas.QuestionCreate(text=text)).id
+    finally:
+        db.close()
+
+@router.post(
+    "/generate_follow_up",
+    response_model=schemas.GenerateFollowUpResponse,
+    summary="Generate a Follow-Up Question",
+    description="Generate a meaningful follow-up question for an elder using provided question IDs."
+)
+async def generate_follow_up_question_api(
+    input_data: schemas.GenerateFollowUpInput,  # Input schema
+    db: Session = Depends(database.get_db),
+):
+    """
+    Generate a follow-up question for an elder using provided question IDs.
+    """
+    question_answer_pairs = await asyncio.to_thread(_get_question_answer_pairs, input_data, db)
+
     # Generate follow-up question using OpenAI
-    follow_up_question = generate_follow_up_question(question_answer_pairs)
+    follow_up_question = await generate_follow_up_question(question_answer_pairs)
 
     # Save the follow-up question in the database
     follow_up_question_data = schemas.QuestionCreate(text=follow_up_question)
-    new_question = crud.create_question(db, question=follow_up_question_data)
+    new_question = await asyncio.to_thread(crud.create_question, db, question=follow_up_question_data)
 
     # Return the generated follow-up question
     return schemas.GenerateFollowUpResponse(
@@ -169,27 +168,90 @@ def generate_follow_up_question_api(
         question_id=new_question.id,
     )
 
+@router.post(
+    "/generate_follow_up/stream",
+    summary="Stream a Follow-Up Question",
+    description="Stream a follow-up question as Server-Sent Events. `token` events carry text deltas; "
+                "the final `done` event carries the saved question_id."
+)
+async def stream_follow_up_question_api(
+    input_data: schemas.GenerateFollowUpInput,
+    db: Session = Depends(database.get_db),
+):
+    """
+    Stream a follow-up question token by token and save it once complete.
+    """
+    question_answer_pairs = await asyncio.to_thread(_get_question_answer_pairs, input_data, db)
+
+    async def event_stream():
+        tokens = []
+        try:
+            async for delta in stream_follow_up_question(question_answer_pairs):
+                tokens.append(delta)
+                yield format_sse("token", {"delta": delta})
+        except Exception as e:
+            yield format_sse("error", {"detail": f"Follow-up generation failed: {str(e)}"})
+            return
+
+        # Save the follow-up question once the stream has finished
+        follow_up_question = "".join(tokens).strip()
+        if not follow_up_question:
+            yield format_sse("error", {"detail": "Follow-up generation returned no text"})
+            return
+        question_id = await asyncio.to_thread(_save_question, follow_up_question)
+
+        yield format_sse("done", schemas.GenerateFollowUpResponse(
+            generated_question=follow_up_question,
+            question_id=question_id,
+        ).dict())
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 @router.get("/tts/{question_id}", summary="Generate TTS for a Question", description="Generate TTS audio for a specific question by its ID.")
-def generate_tts_for_question(question_id: int, db: Session = Depends(database.get_db)):
+async def generate_tts_for_question(question_id: int, stream: bool = False, db: Session = Depends(database.get_db)):
     """
     Generate TTS for a question by its ID.
 
     Args:
         question_id (int): ID of the question.
+        stream (bool): Pipe audio chunks to the client while they are synthesized.
 
     Returns:
-        FileResponse: The generated TTS audio file.
+        FileResponse | StreamingResponse: The generated TTS audio.
     """
     # Fetch the question from the database
-    question = crud.get_question_by_id(db, question_id=question_id)
+    question = await asyncio.to_thread(crud.get_question_by_id, db, question_id=question_id)
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
 
-    # Generate TTS audio using the Elice API
-    try:
-        tts_file_path = generate_tts_openai(question.text)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"TTS generation failed: {str(e)}")
+    # Serve cached audio directly; otherwise stream from the speech API into the cache
+    tts_file_path = cached_tts_openai(question.text) if stream else None
+    if stream and not tts_file_path:
+        audio_stream = stream_tts_openai(question.text)
+        try:
+            first_chunk = await audio_stream.__anext__()
+        except Exception:
+            # Nothing was sent yet: fall back to the hedged, single-flight path below
+            first_chunk = None
+
+        if first_chunk is not None:
+            async def audio_chunks():
+                yield first_chunk
+                async for chunk in audio_stream:
+                    yield chunk
+
+            return StreamingResponse(
+                audio_chunks(),
+                media_type="audio/mpeg",
+                headers={"Content-Disposition": f'inline; filename="question_{question_id}.mp3"'},
+            )
+
+    if not tts_file_path:
+        # Generate TTS audio using the OpenAI API, hedged to Elice when it is slow
+        try:
+            tts_file_path = await generate_question_tts(question.text)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"TTS generation failed: {str(e)}")
 
     # Return the audio file as a response
     return FileResponse(tts_file_path, media_type="audio/mpeg", filename=f"question_{question_id}.mp3")
@@ -1,66 +1,77 @@
-from fastapi import APIRouter, Depends, HTTPException
+import os
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from app import schemas, crud, database, models
-from app.utils.openai_client import summarize_text, generate_title, extract_keywords, generate_image, generate_image_elice
+from typing import List, Optional, Set
+from app import schemas, crud, database, models, record_pipeline
+from app.jobs import enqueue_record_job
+from app.pagination import PageParams, page_params, page_response
+from app.utils.sse import SSE_HEADERS, format_sse
+from app.utils.image_variants import variant_urls
+
+# How often the job progress stream checks the job table (seconds)
+RECORD_JOB_EVENT_INTERVAL = float(os.getenv("RECORD_JOB_EVENT_INTERVAL", "0.5"))
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[schemas.Record])
-def get_all_records(db: Session = Depends(database.get_db)):
+def _record_payload(record: models.Record, fields: Optional[Set[str]] = None) -> dict:
     """
-    Retrieve all records, including an image and keywords.
+    Response body of a record loaded by `crud.get_records_with_details`.
+    With `fields`, only those fields are computed.
     """
-    records = db.query(models.Record).order_by(models.Record.id.desc()).all()
+    def wanted(name: str) -> bool:
+        return fields is None or name in fields
 
-    response = []
-    for record in records:
-        image = crud.get_image_by_record_id(db, record_id=record.id)
-        keywords = crud.get_keywords_by_record_id(db, record_id=record.id)
-        response.append({
-            "id": record.id,
-            "title": record.title,
-            "content": record.content,
-            "elder_id": record.elder_id,
-            "created_at": record.created_at,
-            "image": image,
-            "keywords": keywords,
-        })
+    payload = {
+        name: getattr(record, name)
+        for name in ("id", "title", "content", "elder_id", "created_at")
+        if wanted(name)
+    }
+    if wanted("image") or wanted("image_variants"):
+        image = crud.record_image_url(record)
+        if wanted("image"):
+            payload["image"] = image
+        if wanted("image_variants"):
+            payload["image_variants"] = variant_urls(image)
+    if wanted("keywords"):
+        payload["keywords"] = crud.record_keyword_list(record)
+    return payload
 
-    return response
 
+def _record_page(response: Response, db: Session, page: PageParams, elder_id: Optional[int]):
+    fields = page.select(schemas.Record)
+    records, next_cursor = crud.get_records_with_details(db, elder_id=elder_id, page=page, fields=fields)
+    return page_response(response, schemas.Record, [_record_payload(record, fields) for record in records], next_cursor, fields)
 
 
-@router.get("/user/{elder_id}", response_model=List[schemas.Record])
-def get_records_for_elder(elder_id: int, db: Session = Depends(database.get_db)):
+@router.get("/", response_model=List[schemas.Record])
+def get_all_records(
+    response: Response,
+    elder_id: Optional[int] = None,
+    page: PageParams = Depends(page_params()),
+    db: Session = Depends(database.get_db),
+):
     """
-    Retrieve all records for a specific elder by elder_id, including images and keywords.
+    Retrieve records, newest first, including an image and keywords.
+    All of them are returned unless `limit` is given; pass the `X-Next-Cursor` header back as `cursor` for the next page.
     """
-    records = (
-        db.query(models.Record)
-        .filter(models.Record.elder_id == elder_id)
-        .order_by(models.Record.id.desc())
-        .all()
-    )
-
-    # Enrich each record with image and keywords
-    enriched_records = []
-    for record in records:
-        image = crud.get_image_by_record_id(db, record_id=record.id)
-        keywords = crud.get_keywords_by_record_id(db, record_id=record.id)
-        enriched_records.append({
-            "id": record.id,
-            "title": record.title,
-            "content": record.content,
-            "elder_id": record.elder_id,
-            "created_at": record.created_at,
-            "image": image,
-            "keywords": keywords
-        })
+    return _record_page(response, db, page, elder_id)
 
-    return enriched_records
 
+@router.get("/user/{elder_id}", response_model=List[schemas.Record])
+def get_records_for_elder(
+    elder_id: int,
+    response: Response,
+    page: PageParams = Depends(page_params()),
+    db: Session = Depends(database.get_db),
+):
+    """
+    Retrieve records for a specific elder by elder_id, newest first, including images and keywords.
+    All of them are returned unless `limit` is given.
+    """
+    return _record_page(response, db, page, elder_id)
 
 
 @router.get("/{record_id}", response_model=schemas.Record)
@@ -84,16 +95,13 @@ def get_record_by_id(record_id: int, db: Session = Depends(database.get_db)):
         "elder_id": record.elder_id,
         "created_at": record.created_at,
         "image": image,
+        "image_variants": variant_urls(image),
         "keywords": keywords,
     }
 
-@router.post("/", response_model=dict)
-def create_todays_record(
-    record_create: schemas.RecordCreateInput,
-    db: Session = Depends(database.get_db)
-):
+def _load_record_answers(db: Session, record_create: schemas.RecordCreateInput) -> list:
     """
-    Create today's record for an elder using a list of question IDs, including keywords and images.
+    Validate the elder and return their answers to the requested questions.
     """
     # Validate elder existence
     elder = crud.get_elder_by_id(db, elder_id=record_create.elder_id)
@@ -101,51 +109,115 @@ def create_todays_record(
         raise HTTPException(status_code=404, detail="Elder not found")
 
     # Validate questions and retrieve answers
-    answers_with_questions = crud.get_answers_by_question_ids(
+    answers_with_questions = record_pipeline.load_answers(
         db, elder_id=record_create.elder_id, question_ids=record_create.question_ids
     )
     if not answers_with_questions:
         raise HTTPException(status_code=404, detail="No answers found for the provided questions")
+    return answers_with_questions
 
-    # Combine answers into a single text
-    combined_text = "\n".join([
-        f"Q: {question_text}\nA: {answer.response}"
-        for answer, question_text in answers_with_questions
-    ])
-
-    # Generate content using OpenAI
-    summary = summarize_text(combined_text)
-    title = generate_title(summary)
-    keywords = extract_keywords(summary)
-    image_path = generate_image_elice(", ".join(keywords))  # Save the image locally
-
-    # Create the record
-    record_data = schemas.RecordCreate(
-        title=title,
-        content=summary,
-        elder_id=record_create.elder_id,
-    )
-    new_record = crud.create_record(db, record=record_data)
 
-    # Add keywords to the record
-    for keyword in keywords:
-        keyword_instance = crud.create_or_get_keyword(db, keyword=keyword)
-        crud.add_keyword_to_record(db, record_id=new_record.id, keyword_id=keyword_instance.id)
+def _save_record(db: Session, elder_id: int, draft: schemas.RecordDraft, image_path: str, answers_with_questions: list) -> models.Record:
+    """
+    Create the record with its keywords, image and questions, and commit.
+    """
+    new_record = record_pipeline.add_record(db, elder_id, draft, image_path, answers_with_questions)
+    db.commit()
+    db.refresh(new_record)
+    return new_record
+
+
+@router.post("/", response_model=dict)
+async def create_todays_record(
+    record_create: schemas.RecordCreateInput,
+    background: bool = False,
+    db: Session = Depends(database.get_db)
+):
+    """
+    Create today's record for an elder using a list of question IDs, including keywords and images.
+    With `background=true` the record is generated by a job worker and the response is
+    `202` with the job to poll at `/records/jobs/{job_id}`.
+    """
+    answers_with_questions = await asyncio.to_thread(_load_record_answers, db, record_create)
+
+    if background:
+        job = await enqueue_record_job(db, elder_id=record_create.elder_id, question_ids=record_create.question_ids)
+        return JSONResponse(
+            status_code=202,
+            content=_job_payload(job),
+            headers={"Location": f"/records/jobs/{job.id}"},
+        )
 
-    # Add image to the record in the database
-    crud.add_image_to_record(db, record_id=new_record.id, image_url=image_path)
+    # Generate summary, title and keywords, then the image from the keywords
+    draft = await record_pipeline.generate_draft(record_pipeline.combine_answers(answers_with_questions))
+    image_path = await record_pipeline.generate_record_image(draft.keywords)  # Save the image locally
 
-    # Add record questions for the used questions
-    for answer, question_text in answers_with_questions:
-        crud.add_record_question(db, record_id=new_record.id, question_id=answer.question_id)
+    # Create the record with its keywords, image and questions
+    new_record = await asyncio.to_thread(_save_record, db, record_create.elder_id, draft, image_path, answers_with_questions)
 
     # Return the response including the image and keywords
-    return {
-        "id": new_record.id,
-        "elder_id": new_record.elder_id,
-        "title": new_record.title,
-        "content": new_record.content,
-        "created_at": new_record.created_at,
-        "image": image_path,  # Return the local image path
-        "keywords": keywords  # Return the list of keywords
-    }
+    return record_pipeline.record_response(new_record, image_path, draft.keywords)
+
+
+@router.get("/jobs/{job_id}", response_model=schemas.RecordJob)
+def get_record_job(job_id: int, db: Session = Depends(database.get_db)):
+    """
+    Retrieve the status and progress of a background record job.
+    """
+    job = crud.get_record_job_by_id(db, job_id=job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Record job not found")
+    return job
+
+
+def _job_payload(job: models.RecordJob) -> dict:
+    """
+    Serialize a job the same way as the `GET /records/jobs/{job_id}` response.
+    """
+    return schemas.RecordJob.model_validate(job, from_attributes=True).model_dump(mode="json")
+
+
+def _job_snapshot(job_id: int) -> Optional[dict]:
+    """
+    Read the current state of a job with a fresh session.
+    """
+    db = database.SessionLocal()
+    try:
+        job = crud.get_record_job_by_id(db, job_id=job_id)
+        return _job_payload(job) if job else None
+    finally:
+        db.close()
+
+
+@router.get(
+    "/jobs/{job_id}/events",
+    summary="Stream Record Job Progress",
+    description="Stream a record job's progress as Server-Sent Events. `progress` events are sent whenever "
+                "the stage changes; the stream ends with `done` (carrying record_id) or `error`."
+)
+async def stream_record_job(job_id: int):
+    """
+    Stream progress of a background record job until it finishes.
+    """
+    snapshot = await asyncio.to_thread(_job_snapshot, job_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Record job not found")
+
+    async def event_stream():
+        current = snapshot
+        last_sent = None
+        while True:
+            state = (current["status"], current["stage"], current["progress"])
+            if state != last_sent:
+                last_sent = state
+                yield format_sse("progress", current)
+            if current["status"] == "succeeded":
+                yield format_sse("done", current)
+                return
+            if current["status"] == "failed":
+                yield format_sse("error", {"detail": current["error"], "job_id": job_id})
+                return
+            await asyncio.sleep(RECORD_JOB_EVENT_INTERVAL)
+            current = await asyncio.to_thread(_job_snapshot, job_id)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -1,26 +1,16 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import func
 from typing import List
 from app import schemas, crud, database, models
-from app.utils.openai_client import get_text_embedding
-from scipy.spatial.distance import cosine
+from app.utils.async_openai_client import get_text_embeddings
+from app.utils.similarity import pairwise_cosine
 from sqlalchemy.orm import aliased
 
 router = APIRouter()
 
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy.sql import func
-from typing import List
-from app import schemas, crud, database, models
-from app.utils.openai_client import get_text_embedding
-from scipy.spatial.distance import cosine
-
-router = APIRouter()
-
-
 @router.get("/", response_model=List[schemas.Report])
 def get_reports(
     elder_id: int,
@@ -97,30 +87,19 @@ def get_reports(
             "analyses": analyses_details,
         })
     return report_list
-@router.post("/", response_model=List[schemas.Report])
-def create_reports(
-    elder_id: int,
-    year: int,
-    week_number: int,
-    db: Session = Depends(database.get_db),
-):
+
+
+def _load_guide_answer_pairs(db: Session, elder_id: int) -> list:
     """
-    Create reports for each studied guide in the given week.
-    Each report includes analyses of the questions answered for the guide,
-    along with the question and answers content.
+    First and last answer of every question of the elder's studied guides,
+    one list per guide.
     """
-    from datetime import datetime, timedelta
-
     # Validate elder existence
     elder = crud.get_elder_by_id(db, elder_id=elder_id)
     if not elder:
         raise HTTPException(status_code=404, detail="Elder not found")
 
-    # Calculate start and end dates for the week
-    start_date = datetime.strptime(f"{year}-{week_number}-1", "%Y-%W-%w")
-    end_date = start_date + timedelta(days=6)
-
-    # Fetch all studied guides for the given week range
+    # Fetch all studied guides
     studied_guides = (
         db.query(models.ActivityGuide)
         .filter(
@@ -133,18 +112,9 @@ def create_reports(
     if not studied_guides:
         raise HTTPException(status_code=404, detail="No studied guides found for this week.")
 
-    report_list = []
+    # Collect the first and last answer of every guide question
+    guide_answer_pairs = []
     for guide in studied_guides:
-        # Create a new report for the guide
-        report = models.Report(
-            elder_id=elder_id,
-            year=year,
-            week_number=week_number,
-        )
-        db.add(report)
-        db.commit()
-        db.refresh(report)
-
         # Fetch questions linked to the guide
         questions = (
             db.query(models.Question)
@@ -155,7 +125,7 @@ def create_reports(
             .all()
         )
 
-        analyses = []
+        answer_pairs = []
         for question in questions:
             # Fetch answers for the question within the week
             answers = (
@@ -169,11 +139,30 @@ def create_reports(
             )
             if len(answers) < 2:
                 continue
+            answer_pairs.append((question, answers[0], answers[-1]))
+        guide_answer_pairs.append(answer_pairs)
+    return guide_answer_pairs
+
 
-            first_answer, last_answer = answers[0], answers[-1]
-            first_embedding = get_text_embedding(first_answer.response)
-            last_embedding = get_text_embedding(last_answer.response)
-            similarity = 1 - cosine(first_embedding, last_embedding)
+def _save_reports(db: Session, elder_id: int, year: int, week_number: int, guide_answer_pairs: list, similarities) -> list:
+    """
+    Save one report per guide with an analysis per answer pair, and return the response body.
+    """
+    report_list = []
+    for answer_pairs in guide_answer_pairs:
+        # Create a new report for the guide
+        report = models.Report(
+            elder_id=elder_id,
+            year=year,
+            week_number=week_number,
+        )
+        db.add(report)
+        db.commit()
+        db.refresh(report)
+
+        analyses = []
+        for question, first_answer, last_answer in answer_pairs:
+            similarity = next(similarities)
 
             # Create an analysis for the question
             analysis = models.Analysis(
@@ -211,3 +200,37 @@ def create_reports(
         })
 
     return report_list
+
+
+@router.post("/", response_model=List[schemas.Report])
+async def create_reports(
+    elder_id: int,
+    year: int,
+    week_number: int,
+    db: Session = Depends(database.get_db),
+):
+    """
+    Create reports for each studied guide in the given week.
+    Each report includes analyses of the questions answered for the guide,
+    along with the question and answers content.
+    Database work runs in worker threads so the embedding call is the only await on the loop.
+    """
+    guide_answer_pairs = await asyncio.to_thread(_load_guide_answer_pairs, db, elder_id)
+
+    # Embed every first/last answer across all guides in as few requests as possible
+    answer_texts = [
+        answer.response
+        for answer_pairs in guide_answer_pairs
+        for _, first_answer, last_answer in answer_pairs
+        for answer in (first_answer, last_answer)
+    ]
+    embeddings = dict(zip(answer_texts, await get_text_embeddings(answer_texts)))
+
+    # Score every first/last pair in a single vectorized pass
+    all_pairs = [pair for answer_pairs in guide_answer_pairs for pair in answer_pairs]
+    similarities = iter(pairwise_cosine(
+        [embeddings[first_answer.response] for _, first_answer, _ in all_pairs],
+        [embeddings[last_answer.response] for _, _, last_answer in all_pairs],
+    ).tolist())
+
+    return await asyncio.to_thread(_save_reports, db, elder_id, year, week_number, guide_answer_pairs, similarities)
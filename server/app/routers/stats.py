@@ -0,0 +1,84 @@
+from fastapi import APIRouter
+from app.utils.tts_cache import tts_cache
+from app.utils.embedding_cache import embedding_cache
+from app.utils.image_cache import image_cache
+from app.utils.audio_preprocess import audio_preprocess_stats
+from app.utils.transcription_cache import transcription_cache
+from app.utils.providers import providers
+from app.utils.singleflight import single_flight_stats
+from app.utils.rate_limiter import rate_limit_stats
+from app.utils.hedging import hedging_stats
+
+router = APIRouter()
+
+
+@router.get("/tts_cache")
+def get_tts_cache_stats():
+    """
+    TTS 캐시 적중/실패 횟수와 디스크 사용량 제공
+    """
+    return tts_cache.stats()
+
+
+@router.get("/embedding_cache")
+def get_embedding_cache_stats():
+    """
+    임베딩 캐시 적중/실패 횟수와 저장된 벡터 수 제공
+    """
+    return embedding_cache.stats()
+
+
+@router.get("/image_cache")
+def get_image_cache_stats():
+    """
+    이미지 캐시 적중/실패 횟수와 재사용 가능한 이미지 용량 제공
+    """
+    return image_cache.stats()
+
+
+@router.get("/audio_preprocess")
+def get_audio_preprocess_stats():
+    """
+    음성 전처리로 줄인 업로드 용량과 오디오 길이 제공
+    """
+    return audio_preprocess_stats.as_dict()
+
+
+@router.get("/transcription_cache")
+def get_transcription_cache_stats():
+    """
+    음성 인식 캐시 적중/실패 횟수와 절약한 호출 수 제공
+    """
+    return transcription_cache.stats()
+
+
+@router.get("/single_flight")
+def get_single_flight_stats():
+    """
+    함수별 동시 중복 AI 요청 병합 횟수 제공
+    """
+    return single_flight_stats()
+
+
+@router.get("/providers")
+def get_provider_routing():
+    """
+    작업별 AI 제공자, 모델, 엔드포인트 설정 제공 (API 키 제외)
+    """
+    return providers.describe()
+
+
+@router.get("/rate_limits")
+def get_rate_limit_stats():
+    """
+    공급자별 요청/토큰 예산, 동시 요청 한도와 429 재시도 횟수 제공
+    """
+    return rate_limit_stats()
+
+
+@router.get("/hedging")
+def get_hedging_stats():
+    """
+    작업별 헤지 요청 횟수와 공급자별 p95 지연 시간 제공
+    """
+    return hedging_stats()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import date, datetime
 
 
@@ -59,6 +59,15 @@ class RecordCreateInput(BaseModel):
     question_ids: List[int]
 
 
+class RecordDraft(BaseModel):
+    """
+    Diary summary, title and keywords generated in a single structured-output call.
+    """
+    summary: str
+    title: str
+    keywords: List[str]  # At most 5 keywords
+
+
 class Record(RecordBase):
     """
     Response schema for a record.
@@ -67,12 +76,31 @@ class Record(RecordBase):
     elder_id: int
     created_at: datetime
     image: Optional[str]  # Single image URL
+    image_variants: Optional[Dict[str, str]] = None  # original, webp, medium and thumb URLs
     keywords: List[str]  # List of associated keywords
 
     class Config:
         orm_mode = True
 
 
+class RecordJob(BaseModel):
+    """
+    Response schema for a background record creation job.
+    """
+    id: int
+    elder_id: int
+    status: str  # queued, running, succeeded or failed
+    stage: str
+    progress: int
+    attempts: int
+    record_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
 # Generate Follow-Up Question schemas
 class GenerateFollowUpInput(BaseModel):
     """
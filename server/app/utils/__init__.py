@@ -1,14 +1,3 @@
 # utils/__init__.py
-
-from .openai_client import (
-    transcribe_audio,
-    summarize_text,
-    generate_title,
-    extract_keywords,
-    generate_image,
-    generate_follow_up_question,
-    get_text_embedding,
-    generate_image_elice,
-    generate_tts,
-    generate_tts_openai
-)
+#
+# The AI calls live in `async_openai_client`; import from the submodules directly.
@@ -0,0 +1,540 @@
+"""
+AI calls used by the routers, the record jobs and the CLI.
+
+The calls are built on the per-task `AsyncOpenAI` clients from `providers` and
+the pooled `httpx.AsyncClient` from `http_client`, so routers can await them
+(and run independent ones concurrently) without holding a threadpool worker.
+Prompts and parsers are shared from `openai_client`.
+"""
+import os
+import base64
+import asyncio
+from typing import TYPE_CHECKING, AsyncIterator, List, Optional
+from app import schemas
+from app.utils import http_client
+from app.utils.providers import providers
+from app.utils.tts_cache import tts_cache
+from app.utils.embedding_cache import embedding_cache
+from app.utils.image_cache import image_cache
+from app.utils.transcription_cache import transcription_cache
+from app.utils.singleflight import single_flight
+from app.metrics import observe_ai_call, record_audio_seconds
+from app.utils.hedging import hedgers
+from app.utils.audio_upload import probe_duration
+from app.utils.audio_chunking import LONG_AUDIO_CONCURRENCY, is_long_audio, split_audio, remove_chunks
+from app.utils.openai_client import (
+    ELICE_API_URL,
+    ELICE_TTS_API_URL,
+    _elice_headers,
+    _elice_tts_file_name,
+    _write_file_atomic,
+    _save_image,
+    _file_sha256,
+    _transcription_key,
+    _join_transcripts,
+    _summary_messages,
+    _title_messages,
+    _keyword_messages,
+    _parse_keywords,
+    _record_draft_messages,
+    _parse_record_draft,
+    RECORD_DRAFT_FORMAT,
+    _follow_up_messages,
+    _embedding_batches,
+)
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+@single_flight()
+@observe_ai_call(task="tts")
+async def generate_tts_openai(text: str, model: Optional[str] = None, voice: str = "nova", response_format: str = "mp3") -> str:
+    """
+    Generate speech from text using OpenAI's TTS API.
+    Audio is served from the TTS cache when the same text was already synthesized.
+
+    Args:
+        text (str): Text to synthesize into speech.
+        model (str): TTS model (default: the "tts" provider model).
+        voice (str): Voice preset (default: "nova").
+        response_format (str): Audio format of the output file (default: "mp3").
+
+    Returns:
+        str: Path to the cached TTS audio file.
+    """
+    model = model or providers.model("tts")
+    key = tts_cache.make_key(text, model, voice, response_format)
+    cached_path = tts_cache.get(key, response_format)
+    if cached_path:
+        return cached_path
+
+    # Call OpenAI's TTS API
+    async with providers.async_slot("tts"):
+        response = await providers.async_client("tts").audio.speech.create(
+            model=model,
+            voice=voice,
+            input=text,
+            response_format=response_format
+        )
+
+    # Store the generated audio under its content hash
+    return tts_cache.put(key, response_format, response.content)
+
+
+async def generate_question_tts(text: str) -> str:
+    """
+    Speech for a question from OpenAI TTS, hedged to Elice TTS when OpenAI is
+    slow or failing (see `hedging`). The two use different voices; each
+    provider's audio is cached under its own key, so an Elice fallback never
+    replaces the OpenAI audio served for later requests.
+
+    Args:
+        text (str): Text to synthesize into speech.
+    Returns:
+        str: Path to the TTS audio file.
+    """
+    # Serve cache hits before hedging, so only real provider calls feed the hedge latencies
+    cached_path = cached_tts_openai(text)
+    if cached_path:
+        return cached_path
+
+    return await hedgers["tts"].run({
+        "openai": lambda: generate_tts_openai(text),
+        "elice": lambda: generate_tts(text),
+    })
+
+
+def cached_tts_openai(text: str, model: Optional[str] = None, voice: str = "nova", response_format: str = "mp3") -> Optional[str]:
+    """
+    Return the cached TTS file for `generate_tts_openai` arguments, or None if it was never synthesized.
+    """
+    model = model or providers.model("tts")
+    return tts_cache.get(tts_cache.make_key(text, model, voice, response_format), response_format)
+
+
+@observe_ai_call(task="tts")
+async def stream_tts_openai(text: str, model: Optional[str] = None, voice: str = "nova", response_format: str = "mp3", chunk_size: int = 4096) -> AsyncIterator[bytes]:
+    """
+    Stream speech from OpenAI's TTS API while writing the same bytes to the TTS cache.
+    The cache entry is only published once the whole response has arrived, and
+    never when it was empty.
+
+    Unlike `generate_question_tts` this is neither single-flight nor hedged: a
+    live stream cannot be shared with other callers or raced against Elice.
+    Concurrent streams of one question each call the API and the first to
+    finish fills the cache. Callers fall back to `generate_question_tts` when
+    the stream fails before its first chunk.
+
+    Args:
+        text (str): Text to synthesize into speech.
+        model (str): TTS model (default: the "tts" provider model).
+        voice (str): Voice preset (default: "nova").
+        response_format (str): Audio format (default: "mp3").
+        chunk_size (int): Size of the yielded audio chunks in bytes.
+    Yields:
+        bytes: Audio chunks as they arrive.
+    """
+    model = model or providers.model("tts")
+    writer = tts_cache.open_writer(tts_cache.make_key(text, model, voice, response_format), response_format)
+    try:
+        async with providers.async_slot("tts"):
+            async with providers.async_client("tts").audio.speech.with_streaming_response.create(
+                model=model,
+                voice=voice,
+                input=text,
+                response_format=response_format
+            ) as response:
+                received = 0
+                async for chunk in response.iter_bytes(chunk_size):
+                    writer.write(chunk)
+                    received += len(chunk)
+                    yield chunk
+        if not received:
+            raise Exception("TTS generation returned no audio")
+    except BaseException:
+        writer.discard()
+        raise
+    writer.commit()
+
+
+@single_flight()
+@observe_ai_call(provider="elice", model="tts")
+async def generate_tts(text: str, audio_path: str = "./app/reference_audio.mp3", save_dir: str = "./static/tts/") -> str:
+    """
+    Generate speech from text using the Elice TTS API.
+
+    Args:
+        audio_path (str): Path to the reference audio file.
+        text (str): Text to synthesize into speech.
+        save_dir (str): Directory to save the generated TTS audio (default: "./static/tts/").
+
+    Returns:
+        str: Relative path to the saved TTS audio file.
+    """
+    # Reuse audio already synthesized for this text and reference voice
+    os.makedirs(save_dir, exist_ok=True)
+    file_name = _elice_tts_file_name(text, audio_path)
+    local_file_path = os.path.join(save_dir, file_name)
+    if os.path.exists(local_file_path):
+        return f"{save_dir}/{file_name}"
+
+    # Prepare files and payload for the API request
+    files = {
+        "audio": (os.path.basename(audio_path), http_client.load_reference_audio(audio_path), "audio/mpeg")
+    }
+    payload = {
+        "text": text
+    }
+
+    # Send the request to the Elice API
+    response = await http_client.async_request("elice_tts", "POST", ELICE_TTS_API_URL, files=files, data=payload, headers=_elice_headers())
+
+    # Check for a successful response
+    if response.status_code != 200:
+        raise Exception(f"TTS generation failed with status code {response.status_code}: {response.text}")
+
+    # Decode and save the TTS audio file
+    _write_file_atomic(local_file_path, response.content)
+
+    # Return the relative path for API response
+    return f"{save_dir}/{file_name}"
+
+
+@single_flight()
+@observe_ai_call(provider="elice", model="image")
+async def generate_image_elice(prompt: str, style: str = "oil_painting", width: int = 256, height: int = 256, steps: int = 4, num: int = 1, save_dir: str = "./static/images/") -> str:
+    """
+    Generate an image using the Elice AI Hellothon API and save it locally.
+
+    Args:
+        prompt (str): Description of the image to generate.
+        style (str): Style of the image (default: "oil_painting").
+        width (int): Width of the generated image (default: 256).
+        height (int): Height of the generated image (default: 256).
+        steps (int): Number of diffusion steps (default: 4).
+        num (int): Number of images to generate (default: 1).
+        save_dir (str): Directory to save the image (default: "./static/images/").
+
+    Returns:
+        str: Relative path to the saved image.
+    """
+    # API request payload
+    payload = {
+        "prompt": prompt,
+        "style": style,
+        "width": width,
+        "height": height,
+        "steps": steps,
+        "num": num
+    }
+    headers = {
+        **_elice_headers(),
+        "content-type": "application/json"
+    }
+
+    # Send the request to the Elice API
+    response = await http_client.async_request("elice_image", "POST", ELICE_API_URL, headers=headers, json=payload)
+
+    # Check for a successful response
+    if response.status_code != 200:
+        raise Exception(f"Image generation failed with status code {response.status_code}: {response.text}")
+
+    # Decode the Base64 image
+    image_data = response.json().get("predictions")
+    if not image_data:
+        raise Exception("No image data received from the API.")
+
+    # Save the image and its variants off the event loop and return the relative path for the API response
+    return await asyncio.to_thread(_save_image, base64.b64decode(image_data), save_dir)
+
+
+@single_flight()
+async def generate_image_for_keywords(keywords: List[str], style: str = "oil_painting", width: int = 256, height: int = 256, steps: int = 4, save_dir: str = "./static/images/") -> str:
+    """
+    Generate a record image from keywords, reusing an image already generated
+    for the same keyword set when the image cache allows it. New images come
+    from Elice, hedged to DALL-E when Elice is slow or failing (see `hedging`).
+
+    Args:
+        keywords (List[str]): Keywords describing the image.
+        style (str): Style of the image (default: "oil_painting").
+        width (int): Width of the generated image (default: 256).
+        height (int): Height of the generated image (default: 256).
+        steps (int): Number of diffusion steps (default: 4).
+        save_dir (str): Directory to save the image (default: "./static/images/").
+
+    Returns:
+        str: Relative path to the saved or reused image.
+    """
+    settings = {
+        "elice": {"style": style, "width": width, "height": height, "steps": steps},
+        "dalle": {"size": "1024x1024"},
+    }
+    hedger = hedgers["image"]
+    cached_url = await asyncio.to_thread(image_cache.choose, image_cache.make_key(keywords, hedger.primary, **settings[hedger.primary]))
+    if cached_url:
+        return cached_url
+
+    prompt = ", ".join(keywords)
+
+    async def elice():
+        return "elice", await generate_image_elice(prompt, **settings["elice"], save_dir=save_dir)
+
+    async def dalle():
+        return "dalle", await generate_image(prompt, **settings["dalle"], save_dir=save_dir)
+
+    # Stored under the provider that made it, so a DALL-E fallback is not reused as an Elice image
+    provider, image_url = await hedger.run({"elice": elice, "dalle": dalle})
+    await asyncio.to_thread(image_cache.add, image_cache.make_key(keywords, provider, **settings[provider]), image_url, os.path.join(save_dir, os.path.basename(image_url)))
+    return image_url
+
+
+@single_flight(key=_transcription_key)
+@observe_ai_call(task="stt")
+async def transcribe_audio(file_path: str, audio_sha256: Optional[str] = None) -> str:
+    """
+    Transcribe audio using OpenAI Whisper.
+    Transcriptions are cached by audio hash, so retried uploads skip the API call.
+    Long recordings are split at silences and the chunks transcribed concurrently.
+    Args:
+        file_path (str): Path to the audio file.
+        audio_sha256 (str): Hash of the uploaded audio (default: hash of the file).
+    Returns:
+        str: The transcribed text.
+    """
+    model = providers.model("stt")
+    audio_sha256 = audio_sha256 or await asyncio.to_thread(_file_sha256, file_path)
+    cached = await asyncio.to_thread(transcription_cache.get, model, audio_sha256)
+    if cached is not None:
+        return cached
+
+    chunk_paths = None
+    if await asyncio.to_thread(is_long_audio, file_path):
+        chunk_paths = await asyncio.to_thread(split_audio, file_path)
+
+    if chunk_paths:
+        # Long recording: transcribe the chunks concurrently and stitch them in order
+        semaphore = asyncio.Semaphore(LONG_AUDIO_CONCURRENCY)
+
+        async def transcribe_chunk(chunk_path: str) -> str:
+            async with semaphore:
+                return await _transcribe_file(chunk_path, model)
+
+        try:
+            texts = await asyncio.gather(*(transcribe_chunk(chunk_path) for chunk_path in chunk_paths))
+        finally:
+            remove_chunks(chunk_paths)
+        text = _join_transcripts(texts)
+    else:
+        text = await _transcribe_file(file_path, model)
+
+    await asyncio.to_thread(transcription_cache.put, model, audio_sha256, text)
+    return text
+
+
+async def _transcribe_file(file_path: str, model: str) -> str:
+    """
+    Send one audio file to the speech-to-text API.
+    """
+    with open(file_path, "rb") as audio_file:
+        async with providers.async_slot("stt"):
+            response = await providers.async_client("stt").audio.transcriptions.create(
+                model=model,
+                file=audio_file,
+            )
+    record_audio_seconds(providers.config("stt").provider, model, await asyncio.to_thread(probe_duration, file_path))
+    return response.text
+
+
+@single_flight()
+@observe_ai_call(task="summary")
+async def summarize_text(content: str) -> str:
+    """
+    질의와 응답을 바탕으로 꼬리 질문이 이어진 노인의 일기 형식으로 텍스트를 재구성합니다.
+
+    Args:
+        content (str): 질의-응답 형식의 원문 텍스트.
+
+    Returns:
+        str: 노인의 일기 형식으로 변환된 텍스트.
+    """
+    async with providers.async_slot("summary"):
+        response = await providers.async_client("summary").chat.completions.create(
+            model=providers.model("summary"),
+            messages=_summary_messages(content)
+        )
+    return response.choices[0].message.content.strip()
+
+
+@single_flight()
+@observe_ai_call(task="title")
+async def generate_title(content: str) -> str:
+    """
+    주어진 텍스트 내용을 바탕으로 적절한 제목을 생성합니다.
+    Args:
+        content (str): 제목을 생성할 텍스트.
+    Returns:
+        str: 생성된 제목.
+    """
+    async with providers.async_slot("title"):
+        response = await providers.async_client("title").chat.completions.create(
+            model=providers.model("title"),
+            messages=_title_messages(content)
+        )
+    return response.choices[0].message.content.strip()
+
+
+@single_flight()
+@observe_ai_call(task="keywords")
+async def extract_keywords(content: str) -> List[str]:
+    """
+    주어진 텍스트에서 최대 5개의 핵심 키워드를 추출합니다.
+    Args:
+        content (str): 키워드를 추출할 텍스트.
+    Returns:
+        List[str]: 추출된 키워드 리스트 (최대 5개).
+    """
+    async with providers.async_slot("keywords"):
+        response = await providers.async_client("keywords").chat.completions.create(
+            model=providers.model("keywords"),
+            messages=_keyword_messages(content)
+        )
+    # 결과를 쉼표로 구분된 키워드로 반환
+    return _parse_keywords(response.choices[0].message.content.strip())
+
+
+@single_flight()
+@observe_ai_call(task="diary")
+async def generate_record_draft(content: str) -> schemas.RecordDraft:
+    """
+    질의와 응답으로 일기, 제목, 키워드를 한 번의 요청으로 생성합니다.
+    Args:
+        content (str): 질의-응답 형식의 원문 텍스트.
+    Returns:
+        schemas.RecordDraft: 일기(summary), 제목(title), 키워드(keywords, 최대 5개).
+    """
+    async with providers.async_slot("diary"):
+        response = await providers.async_client("diary").chat.completions.create(
+            model=providers.model("diary"),
+            messages=_record_draft_messages(content),
+            response_format=RECORD_DRAFT_FORMAT
+        )
+    return _parse_record_draft(response.choices[0].message)
+
+
+@single_flight()
+@observe_ai_call(task="image")
+async def generate_image(prompt: str, size: str = "1024x1024", save_dir: str = "./static/images/") -> str:
+    """
+    Generate an image using OpenAI DALL-E and save it locally.
+
+    Args:
+        prompt (str): Description of the image to generate.
+        size (str): Image size (default: "1024x1024").
+        save_dir (str): Directory to save the image (default: "./static/images/").
+
+    Returns:
+        str: Relative path to the saved image.
+    """
+    async with providers.async_slot("image"):
+        response = await providers.async_client("image").images.generate(
+            model=providers.model("image"),
+            prompt=prompt,
+            size=size,
+            quality="standard",
+            n=1
+        )
+
+    # Download and save the image locally
+    image_response = await http_client.async_request("image_download", "GET", response.data[0].url)
+    return await asyncio.to_thread(_save_image, image_response.content, save_dir)
+
+
+@single_flight()
+@observe_ai_call(task="follow_up")
+async def generate_follow_up_question(question_answer_pairs: List[dict]) -> str:
+    """
+    Generate a follow-up question with empathy and continuity using OpenAI GPT.
+    Args:
+        question_answer_pairs (List[dict]): List of question-answer pairs.
+    Returns:
+        str: Empathetic response and a follow-up question.
+    """
+    async with providers.async_slot("follow_up"):
+        response = await providers.async_client("follow_up").chat.completions.create(
+            model=providers.model("follow_up"),
+            messages=_follow_up_messages(question_answer_pairs)
+        )
+    return response.choices[0].message.content.strip()
+
+
+@observe_ai_call(task="follow_up")
+async def stream_follow_up_question(question_answer_pairs: List[dict]) -> AsyncIterator[str]:
+    """
+    Stream a follow-up question token by token using OpenAI GPT.
+    Args:
+        question_answer_pairs (List[dict]): List of question-answer pairs.
+    Yields:
+        str: Text deltas of the empathetic response and follow-up question.
+    """
+    async with providers.async_slot("follow_up"):
+        stream = await providers.async_client("follow_up").chat.completions.create(
+            model=providers.model("follow_up"),
+            messages=_follow_up_messages(question_answer_pairs),
+            stream=True
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+@single_flight()
+@observe_ai_call(task="embedding")
+async def get_text_embedding(text: str) -> "np.ndarray":
+    """
+    Get the embedding for a given text using OpenAI's embedding model, as a
+    read-only float32 array. Vectors are served from the persistent
+    embedding cache when available.
+    """
+    model = providers.model("embedding")
+    cached = await asyncio.to_thread(embedding_cache.get, model, text)
+    if cached is not None:
+        return cached
+
+    async with providers.async_slot("embedding"):
+        response = await providers.async_client("embedding").embeddings.create(
+            input=text,
+            model=model
+        )
+    return await asyncio.to_thread(embedding_cache.put, model, text, response.data[0].embedding)
+
+
+@single_flight()
+@observe_ai_call(task="embedding")
+async def get_text_embeddings(texts: List[str]) -> List["np.ndarray"]:
+    """
+    Get embeddings for many texts with as few embedding requests as possible.
+    Cached vectors are reused and duplicate texts are only sent once.
+
+    Args:
+        texts (List[str]): Texts to embed.
+    Returns:
+        List[np.ndarray]: Read-only float32 embeddings in the same order as `texts`.
+    """
+    model = providers.model("embedding")
+    vectors = await asyncio.to_thread(embedding_cache.get_many, model, texts)
+    missing = list(dict.fromkeys(text for text in texts if text not in vectors))
+
+    async def embed_batch(batch: List[str]) -> dict:
+        async with providers.async_slot("embedding"):
+            response = await providers.async_client("embedding").embeddings.create(
+                input=batch,
+                model=model
+            )
+        return {text: item.embedding for text, item in zip(batch, sorted(response.data, key=lambda item: item.index))}
+
+    for embedded in await asyncio.gather(*(embed_batch(batch) for batch in _embedding_batches(missing))):
+        vectors.update(await asyncio.to_thread(embedding_cache.put_many, model, embedded))
+
+    return [vectors[text] for text in texts]
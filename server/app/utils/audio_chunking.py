@@ -0,0 +1,199 @@
+"""
+Splitting long recordings into chunks for parallel transcription.
+
+Recordings longer than LONG_AUDIO_THRESHOLD_SECONDS are cut into chunks of
+at most LONG_AUDIO_CHUNK_SECONDS. Each cut is placed in a 20 ms window
+between LONG_AUDIO_MIN_CHUNK_SECONDS and LONG_AUDIO_CHUNK_SECONDS into the
+chunk: the latest silent one, or the quietest if none is silent, so words
+are not split. WAV files are split directly. Other formats are decoded with
+ffmpeg (when it is installed) only to find the cuts; the chunks themselves
+are cut from the original with stream copy, so they stay in the compressed
+source format. Formats that cannot be stream-copied are re-encoded to Opus.
+"""
+import os
+import shutil
+import tempfile
+import subprocess
+from uuid import uuid4
+from typing import TYPE_CHECKING, List, Optional, Tuple
+from app.utils.audio_upload import probe_duration
+from app.utils.audio_preprocess import (
+    AUDIO_SAMPLE_RATE,
+    AUDIO_FFMPEG_TIMEOUT,
+    AUDIO_OPUS_BITRATE,
+    AUDIO_SILENCE_THRESHOLD_DB,
+    _SILENCE_WINDOW,
+    _read_wav,
+    _window_levels,
+    _write_wav,
+)
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Long-audio mode settings
+LONG_AUDIO_ENABLED = os.getenv("LONG_AUDIO_ENABLED", "true").lower() in ("1", "true", "yes")
+LONG_AUDIO_THRESHOLD_SECONDS = float(os.getenv("LONG_AUDIO_THRESHOLD_SECONDS", "120"))
+LONG_AUDIO_CHUNK_SECONDS = float(os.getenv("LONG_AUDIO_CHUNK_SECONDS", "60"))
+LONG_AUDIO_MIN_CHUNK_SECONDS = float(os.getenv("LONG_AUDIO_MIN_CHUNK_SECONDS", "30"))
+LONG_AUDIO_CONCURRENCY = int(os.getenv("LONG_AUDIO_CONCURRENCY", "4"))
+
+# ffmpeg muxer used to stream-copy chunks of each upload format
+_COPY_FORMATS = {
+    ".flac": "flac",
+    ".m4a": "mp4",
+    ".mp3": "mp3",
+    ".mp4": "mp4",
+    ".mpeg": "mp3",
+    ".mpga": "mp3",
+    ".oga": "ogg",
+    ".ogg": "ogg",
+    ".webm": "webm",
+}
+
+
+def is_long_audio(path: str) -> bool:
+    """
+    Whether a recording should be transcribed in chunks.
+    """
+    if not LONG_AUDIO_ENABLED:
+        return False
+    duration = probe_duration(path)
+    return duration is not None and duration > LONG_AUDIO_THRESHOLD_SECONDS
+
+
+def find_cut_points(samples: "np.ndarray", rate: int) -> List[int]:
+    """
+    Sample offsets where the recording should be cut.
+
+    Returns:
+        List[int]: Increasing offsets, excluding 0 and the end of the recording.
+    """
+    import numpy as np
+
+    window = max(1, int(rate * _SILENCE_WINDOW))
+    levels = _window_levels(samples, window)
+    max_length = int(LONG_AUDIO_CHUNK_SECONDS * rate)
+    min_length = min(int(LONG_AUDIO_MIN_CHUNK_SECONDS * rate), max_length - window)
+
+    cuts = []
+    start = 0
+    while len(samples) - start > max_length:
+        first_window = (start + min_length) // window
+        last_window = (start + max_length) // window
+        region = levels[first_window:last_window]
+        # Prefer the latest silent window so chunks stay long; else the quietest one
+        silent = np.flatnonzero(region <= AUDIO_SILENCE_THRESHOLD_DB)
+        offset = int(silent[-1]) if len(silent) else int(np.argmin(region))
+        cut = (first_window + offset) * window + window // 2
+        cuts.append(cut)
+        start = cut
+    return cuts
+
+
+def _decode_samples(path: str) -> Tuple["np.ndarray", int]:
+    """
+    Decode a recording to mono float32 samples with ffmpeg, to find the cuts.
+    """
+    import numpy as np
+
+    result = subprocess.run(
+        ["ffmpeg", "-nostdin", "-v", "error", "-i", path, "-vn", "-ac", "1", "-ar", str(AUDIO_SAMPLE_RATE), "-f", "s16le", "-"],
+        capture_output=True, timeout=AUDIO_FFMPEG_TIMEOUT, check=True,
+    )
+    return np.frombuffer(result.stdout, dtype="<i2").astype(np.float32) / 32768.0, AUDIO_SAMPLE_RATE
+
+
+def _chunk_files(output_dir: str, prefix: str) -> List[str]:
+    return sorted(os.path.join(output_dir, file_name) for file_name in os.listdir(output_dir) if file_name.startswith(prefix))
+
+
+def _segment(path: str, cut_seconds: List[float], output_dir: str, codec_args: List[str], muxer: str, suffix: str) -> List[str]:
+    """
+    Cut a recording at the given times with ffmpeg's segment muxer.
+    """
+    prefix = f"chunk-{uuid4().hex}-"
+    times = ["-segment_times", ",".join(f"{seconds:.3f}" for seconds in cut_seconds)] if cut_seconds else []
+    try:
+        subprocess.run(
+            [
+                "ffmpeg", "-nostdin", "-v", "error", "-i", path, "-map", "0:a:0", *codec_args,
+                "-f", "segment", "-segment_format", muxer, *times,
+                "-reset_timestamps", "1", os.path.join(output_dir, f"{prefix}%03d{suffix}"),
+            ],
+            capture_output=True, timeout=AUDIO_FFMPEG_TIMEOUT, check=True,
+        )
+    except Exception:
+        remove_chunks(_chunk_files(output_dir, prefix))
+        raise
+    return _chunk_files(output_dir, prefix)
+
+
+def _split_encoded(path: str, cut_seconds: List[float], output_dir: str) -> List[str]:
+    """
+    Cut a compressed recording without decoding it, or re-encode the chunks
+    to Opus when the source format cannot be stream-copied.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    muxer = _COPY_FORMATS.get(extension)
+    if muxer is not None:
+        try:
+            return _segment(path, cut_seconds, output_dir, ["-c", "copy"], muxer, extension)
+        except subprocess.CalledProcessError:
+            pass
+    opus_args = ["-ac", "1", "-ar", str(AUDIO_SAMPLE_RATE), "-c:a", "libopus", "-b:a", AUDIO_OPUS_BITRATE, "-application", "voip"]
+    return _segment(path, cut_seconds, output_dir, opus_args, "ogg", ".ogg")
+
+
+def _split_wav(samples: "np.ndarray", rate: int, cuts: List[int], output_dir: str) -> List[str]:
+    """
+    Write the samples between the cuts as WAV chunks.
+    """
+    bounds = [0, *cuts, len(samples)]
+    chunk_paths = []
+    try:
+        for index, (start, end) in enumerate(zip(bounds, bounds[1:])):
+            fd, chunk_path = tempfile.mkstemp(dir=output_dir, prefix=f"chunk-{index:03d}-", suffix=".wav")
+            os.close(fd)
+            chunk_paths.append(chunk_path)
+            _write_wav(chunk_path, samples[start:end], rate)
+    except Exception:
+        remove_chunks(chunk_paths)
+        raise
+    return chunk_paths
+
+
+def split_audio(path: str, output_dir: Optional[str] = None) -> Optional[List[str]]:
+    """
+    Split a recording at silences into chunks, in order. WAV recordings give
+    WAV chunks; other formats keep their own format where possible.
+    The caller removes the returned files.
+
+    Args:
+        path (str): Recording to split.
+        output_dir (str): Directory for the chunk files (default: next to the recording).
+    Returns:
+        Optional[List[str]]: Chunk paths, or None when the format cannot be
+        split here (not WAV and no ffmpeg).
+    """
+    output_dir = output_dir or os.path.dirname(path)
+    if path.lower().endswith(".wav"):
+        samples, rate = _read_wav(path)
+        return _split_wav(samples, rate, find_cut_points(samples, rate), output_dir)
+
+    if shutil.which("ffmpeg") is None:
+        return None
+    samples, rate = _decode_samples(path)
+    cuts = find_cut_points(samples, rate)
+    return _split_encoded(path, [cut / rate for cut in cuts], output_dir)
+
+
+def remove_chunks(chunk_paths: List[str]):
+    """
+    Delete chunk files created by `split_audio`.
+    """
+    for chunk_path in chunk_paths:
+        try:
+            os.remove(chunk_path)
+        except FileNotFoundError:
+            pass
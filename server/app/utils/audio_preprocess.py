@@ -0,0 +1,257 @@
+"""
+Audio normalization before transcription.
+
+Recordings are downmixed to mono, resampled to 16 kHz (what Whisper uses
+internally), trimmed of leading/trailing silence and, when ffmpeg is
+installed, encoded to Opus. Without ffmpeg, WAV uploads are still
+downmixed, resampled and trimmed in NumPy and written as 16-bit PCM WAV;
+other formats are passed through unchanged.
+
+Every call is measured, and the totals are exposed at /stats/audio_preprocess.
+"""
+import os
+import time
+import logging
+import wave
+import shutil
+import tempfile
+import threading
+import subprocess
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+from app.utils.audio_upload import probe_duration
+
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Normalization settings
+AUDIO_NORMALIZE = os.getenv("AUDIO_NORMALIZE", "true").lower() in ("1", "true", "yes")
+AUDIO_SAMPLE_RATE = int(os.getenv("AUDIO_SAMPLE_RATE", "16000"))
+AUDIO_SILENCE_THRESHOLD_DB = float(os.getenv("AUDIO_SILENCE_THRESHOLD_DB", "-45"))
+AUDIO_SILENCE_PADDING = float(os.getenv("AUDIO_SILENCE_PADDING", "0.2"))  # Seconds kept around speech
+AUDIO_OPUS_BITRATE = os.getenv("AUDIO_OPUS_BITRATE", "24k")
+AUDIO_FFMPEG_TIMEOUT = float(os.getenv("AUDIO_FFMPEG_TIMEOUT", "60"))
+
+# Window used to find silence in the NumPy path
+_SILENCE_WINDOW = 0.02
+
+
+@dataclass
+class NormalizedAudio:
+    """
+    Result of normalizing one recording.
+    """
+    path: str  # File to transcribe; the input path when nothing was done
+    method: str  # "ffmpeg", "numpy" or "passthrough"
+    input_bytes: int
+    output_bytes: int
+    input_seconds: Optional[float] = None
+    output_seconds: Optional[float] = None
+    elapsed: float = 0.0
+
+    @property
+    def changed(self) -> bool:
+        return self.method != "passthrough"
+
+
+class AudioPreprocessStats:
+    """
+    Running totals of bytes and audio seconds removed before upload.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.files = 0
+        self.normalized = 0
+        self.input_bytes = 0
+        self.output_bytes = 0
+        self.input_seconds = 0.0
+        self.output_seconds = 0.0
+        self.preprocess_seconds = 0.0
+
+    def record(self, result: NormalizedAudio):
+        with self._lock:
+            self.files += 1
+            self.normalized += int(result.changed)
+            self.input_bytes += result.input_bytes
+            self.output_bytes += result.output_bytes
+            if result.input_seconds is not None and result.output_seconds is not None:
+                self.input_seconds += result.input_seconds
+                self.output_seconds += result.output_seconds
+            self.preprocess_seconds += result.elapsed
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "files": self.files,
+                "normalized": self.normalized,
+                "input_bytes": self.input_bytes,
+                "output_bytes": self.output_bytes,
+                "bytes_saved": self.input_bytes - self.output_bytes,
+                "audio_seconds_saved": round(self.input_seconds - self.output_seconds, 3),
+                "preprocess_seconds": round(self.preprocess_seconds, 3),
+                "ffmpeg": shutil.which("ffmpeg") is not None,
+            }
+
+
+audio_preprocess_stats = AudioPreprocessStats()
+
+
+def _silence_filter() -> str:
+    """
+    ffmpeg filter that trims silence at both ends (reverse, trim the start, reverse back).
+    """
+    trim = (
+        f"silenceremove=start_periods=1:start_threshold={AUDIO_SILENCE_THRESHOLD_DB}dB"
+        f":start_silence={AUDIO_SILENCE_PADDING}"
+    )
+    return f"{trim},areverse,{trim},areverse"
+
+
+def _normalize_ffmpeg(input_path: str, output_path: str):
+    subprocess.run(
+        [
+            "ffmpeg", "-nostdin", "-v", "error", "-y", "-i", input_path,
+            "-vn", "-ac", "1", "-ar", str(AUDIO_SAMPLE_RATE), "-af", _silence_filter(),
+            "-c:a", "libopus", "-b:a", AUDIO_OPUS_BITRATE, "-application", "voip",
+            output_path,
+        ],
+        capture_output=True, timeout=AUDIO_FFMPEG_TIMEOUT, check=True,
+    )
+
+
+def _read_wav(path: str):
+    """
+    Read PCM WAV samples as mono float32 in [-1, 1].
+    """
+    import numpy as np
+
+    with wave.open(path, "rb") as wav_file:
+        channels = wav_file.getnchannels()
+        sample_width = wav_file.getsampwidth()
+        rate = wav_file.getframerate()
+        frames = wav_file.readframes(wav_file.getnframes())
+
+    if sample_width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    elif sample_width == 4:
+        samples = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {sample_width}")
+    return samples.reshape(-1, channels).mean(axis=1), rate
+
+
+def _window_levels(samples: "np.ndarray", window: int) -> "np.ndarray":
+    """
+    RMS level in dBFS of each full window of samples.
+    """
+    import numpy as np
+
+    count = len(samples) // window
+    rms = np.sqrt(np.mean(samples[:count * window].reshape(count, window) ** 2, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def _trim_silence(samples: "np.ndarray", rate: int) -> "np.ndarray":
+    """
+    Cut leading and trailing windows quieter than the threshold, keeping some padding.
+    """
+    import numpy as np
+
+    window = max(1, int(rate * _SILENCE_WINDOW))
+    levels = _window_levels(samples, window)
+    if len(levels) == 0:
+        return samples
+    loud = np.flatnonzero(levels > AUDIO_SILENCE_THRESHOLD_DB)
+    if len(loud) == 0:
+        return samples  # All quiet; leave it to the transcription model
+    padding = int(rate * AUDIO_SILENCE_PADDING)
+    start = max(0, loud[0] * window - padding)
+    end = min(len(samples), (loud[-1] + 1) * window + padding)
+    return samples[start:end]
+
+
+def _resample(samples: "np.ndarray", rate: int, target_rate: int) -> "np.ndarray":
+    """
+    Linear-interpolation resampling; enough for speech going to a 16 kHz model.
+    """
+    import numpy as np
+
+    if rate == target_rate or len(samples) == 0:
+        return samples
+    duration = len(samples) / rate
+    target_times = np.arange(int(duration * target_rate)) / target_rate
+    return np.interp(target_times, np.arange(len(samples)) / rate, samples).astype(np.float32)
+
+
+def _write_wav(path: str, samples: "np.ndarray", rate: int):
+    """
+    Write mono float samples as 16-bit PCM WAV.
+    """
+    import numpy as np
+
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(path, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(rate)
+        wav_file.writeframes(pcm.tobytes())
+
+
+def _normalize_wav(input_path: str, output_path: str):
+    samples, rate = _read_wav(input_path)
+    _write_wav(output_path, _resample(_trim_silence(samples, rate), rate, AUDIO_SAMPLE_RATE), AUDIO_SAMPLE_RATE)
+
+
+def normalize_audio(input_path: str, output_dir: Optional[str] = None) -> NormalizedAudio:
+    """
+    Normalize a recording for transcription.
+    The caller removes `result.path` when it differs from `input_path`.
+
+    Args:
+        input_path (str): Path to the uploaded recording.
+        output_dir (str): Directory for the normalized file (default: next to the input).
+    Returns:
+        NormalizedAudio: The file to transcribe and what normalization saved.
+    """
+    started = time.perf_counter()
+    input_bytes = os.path.getsize(input_path)
+    result = NormalizedAudio(path=input_path, method="passthrough", input_bytes=input_bytes, output_bytes=input_bytes)
+    if not AUDIO_NORMALIZE:
+        return result
+
+    method = None
+    if shutil.which("ffmpeg"):
+        method, suffix, normalize = "ffmpeg", ".ogg", _normalize_ffmpeg
+    elif input_path.lower().endswith(".wav"):
+        method, suffix, normalize = "numpy", ".wav", _normalize_wav
+
+    if method:
+        fd, output_path = tempfile.mkstemp(dir=output_dir or os.path.dirname(input_path), prefix="normalized-", suffix=suffix)
+        os.close(fd)
+        try:
+            normalize(input_path, output_path)
+            output_bytes = os.path.getsize(output_path)
+            # Keep the original when normalization did not make it smaller (or emptied it)
+            if 0 < output_bytes < input_bytes:
+                result = NormalizedAudio(
+                    path=output_path,
+                    method=method,
+                    input_bytes=input_bytes,
+                    output_bytes=output_bytes,
+                    input_seconds=probe_duration(input_path),
+                    output_seconds=probe_duration(output_path),
+                )
+            else:
+                os.remove(output_path)
+        except Exception as e:
+            logger.warning("Audio normalization failed for %s, uploading original: %s", input_path, e)
+            os.remove(output_path)
+
+    result.elapsed = time.perf_counter() - started
+    audio_preprocess_stats.record(result)
+    return result
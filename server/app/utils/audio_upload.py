@@ -0,0 +1,141 @@
+"""
+Bounded, chunked handling of uploaded answer recordings.
+
+Uploads are copied in fixed-size chunks to a temp file (never read whole into
+memory), checked against size, type and duration limits, and the temp file
+is removed on every exit path.
+"""
+import os
+import json
+import asyncio
+import shutil
+import hashlib
+import tempfile
+import subprocess
+import wave
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+from fastapi import HTTPException, UploadFile
+
+# Upload limits; Whisper accepts files up to 25 MB
+AUDIO_UPLOAD_MAX_BYTES = int(os.getenv("AUDIO_UPLOAD_MAX_BYTES", str(25 * 1024 * 1024)))
+AUDIO_UPLOAD_MAX_SECONDS = float(os.getenv("AUDIO_UPLOAD_MAX_SECONDS", "600"))
+AUDIO_UPLOAD_CHUNK_SIZE = int(os.getenv("AUDIO_UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+AUDIO_UPLOAD_DIR = os.getenv("AUDIO_UPLOAD_DIR", tempfile.gettempdir())
+
+# Formats the transcription API understands
+ALLOWED_AUDIO_EXTENSIONS = {".flac", ".m4a", ".mp3", ".mp4", ".mpeg", ".mpga", ".oga", ".ogg", ".wav", ".webm"}
+ALLOWED_AUDIO_TYPES = {
+    "audio/flac", "audio/x-flac", "audio/m4a", "audio/x-m4a", "audio/mp4", "audio/mpeg", "audio/mp3",
+    "audio/ogg", "audio/wav", "audio/x-wav", "audio/wave", "audio/webm", "video/mp4", "video/webm",
+}
+# Generic types some clients send; the file extension decides for these
+GENERIC_TYPES = {"", "application/octet-stream"}
+
+
+@dataclass
+class SpooledAudio:
+    """
+    An uploaded recording copied to a local temp file.
+    """
+    path: str
+    filename: str
+    content_type: str
+    size: int
+    sha256: str
+    duration: Optional[float] = None  # Seconds, when it could be determined
+
+
+def _extension(filename: Optional[str]) -> str:
+    return os.path.splitext(filename or "")[1].lower()
+
+
+def check_audio_type(upload: UploadFile):
+    """
+    Reject uploads that are not a supported audio format before reading them.
+    """
+    content_type = (upload.content_type or "").split(";")[0].strip().lower()
+    extension = _extension(upload.filename)
+    if content_type in GENERIC_TYPES:
+        allowed = extension in ALLOWED_AUDIO_EXTENSIONS
+    else:
+        allowed = content_type in ALLOWED_AUDIO_TYPES
+    if not allowed:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported audio type: {content_type or 'unknown'} ({upload.filename})",
+        )
+
+
+def probe_duration(path: str) -> Optional[float]:
+    """
+    Duration of an audio file in seconds, from the WAV header or ffprobe.
+    Returns None when neither can tell.
+    """
+    try:
+        with wave.open(path, "rb") as wav_file:
+            return wav_file.getnframes() / float(wav_file.getframerate())
+    except (wave.Error, EOFError):
+        pass
+
+    if shutil.which("ffprobe") is None:
+        return None
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "json", path],
+            capture_output=True, timeout=10, check=True,
+        )
+        return float(json.loads(result.stdout)["format"]["duration"])
+    except (subprocess.SubprocessError, KeyError, ValueError):
+        return None
+
+
+@asynccontextmanager
+async def spooled_audio(upload: UploadFile) -> AsyncIterator[SpooledAudio]:
+    """
+    Copy an upload to a temp file chunk by chunk while enforcing the limits.
+
+    Raises:
+        HTTPException: 415 for unsupported types, 413 for files that are too large or too long.
+    Yields:
+        SpooledAudio: The local copy; it is deleted when the context exits.
+    """
+    check_audio_type(upload)
+    if upload.size is not None and upload.size > AUDIO_UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Audio file exceeds {AUDIO_UPLOAD_MAX_BYTES} bytes")
+
+    os.makedirs(AUDIO_UPLOAD_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=AUDIO_UPLOAD_DIR, prefix="answer-", suffix=_extension(upload.filename) or ".audio")
+    try:
+        digest = hashlib.sha256()
+        size = 0
+        with os.fdopen(fd, "wb") as file:
+            while chunk := await upload.read(AUDIO_UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > AUDIO_UPLOAD_MAX_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Audio file exceeds {AUDIO_UPLOAD_MAX_BYTES} bytes")
+                digest.update(chunk)
+                file.write(chunk)
+
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Audio file is empty")
+
+        duration = await asyncio.to_thread(probe_duration, path)
+        if duration is not None and duration > AUDIO_UPLOAD_MAX_SECONDS:
+            raise HTTPException(status_code=413, detail=f"Audio is longer than {AUDIO_UPLOAD_MAX_SECONDS:g} seconds")
+
+        yield SpooledAudio(
+            path=path,
+            filename=upload.filename or os.path.basename(path),
+            content_type=upload.content_type or "",
+            size=size,
+            sha256=digest.hexdigest(),
+            duration=duration,
+        )
+    finally:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        await upload.close()
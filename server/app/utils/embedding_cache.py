@@ -0,0 +1,189 @@
+import os
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Sequence
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# SQLite file holding embeddings, vector storage precision and in-process LRU size
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./cache/embeddings.sqlite3")
+EMBEDDING_CACHE_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE", "float32")
+EMBEDDING_CACHE_LRU_SIZE = int(os.getenv("EMBEDDING_CACHE_LRU_SIZE", "4096"))
+
+# On-disk layout of each supported storage precision
+_DTYPES = {"float32": "<f4", "float16": "<f2"}
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _as_vector(vector: Sequence[float]) -> "np.ndarray":
+    """
+    Read-only float32 copy of a vector, the form kept in the LRU and returned to callers.
+    """
+    import numpy as np
+
+    array = np.array(vector, dtype=np.float32)
+    array.flags.writeable = False
+    return array
+
+
+def _pack(vector: "np.ndarray", dtype: str) -> bytes:
+    """
+    Encode a vector as a compact little-endian float32/float16 blob.
+    """
+    return vector.astype(_DTYPES[dtype]).tobytes()
+
+
+def _unpack(blob: bytes, dtype: str) -> "np.ndarray":
+    """
+    Decode a blob written by `_pack` into a float32 vector.
+    """
+    import numpy as np
+
+    return _as_vector(np.frombuffer(blob, dtype=_DTYPES[dtype]))
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding store keyed by (model, sha256(text)).
+
+    Vectors live in a local SQLite file as float32 (or float16) blobs so they
+    survive restarts and are shared by every worker on the host. A small
+    in-process LRU of float32 arrays sits in front of SQLite for repeated
+    lookups. Vectors are returned as read-only float32 numpy arrays, ready
+    for `similarity` without conversion.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, dtype: str = EMBEDDING_CACHE_DTYPE, lru_size: int = EMBEDDING_CACHE_LRU_SIZE):
+        if dtype not in _DTYPES:
+            raise ValueError(f"Unsupported embedding cache dtype: {dtype}")
+        self.path = path
+        self.dtype = dtype
+        self.lru_size = lru_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()  # (model, text hash) -> float32 vector
+        self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Open the SQLite file on first use.
+        """
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL,"
+                " text_hash TEXT NOT NULL,"
+                " dtype TEXT NOT NULL,"
+                " dim INTEGER NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " PRIMARY KEY (model, text_hash))"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, key: tuple, vector: "np.ndarray"):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get_many(self, model: str, texts: Iterable[str]) -> Dict[str, "np.ndarray"]:
+        """
+        Look up several texts at once.
+
+        Returns:
+            Dict[str, np.ndarray]: Cached vectors by text; misses are omitted.
+        """
+        texts = set(texts)
+        found = {}
+        pending = {}
+        with self._lock:
+            for text in texts:
+                key = (model, _text_hash(text))
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    found[text] = self._lru[key]
+                else:
+                    pending[key[1]] = text
+
+            hashes = list(pending)
+            conn = self._connection()
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT text_hash, dtype, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(chunk))})",
+                    [model, *chunk],
+                ).fetchall()
+                for text_hash, dtype, blob in rows:
+                    vector = _unpack(blob, dtype)
+                    self._remember((model, text_hash), vector)
+                    found[pending[text_hash]] = vector
+
+            self.hits += len(found)
+            self.misses += len(texts) - len(found)
+        return found
+
+    def get(self, model: str, text: str) -> Optional["np.ndarray"]:
+        """
+        Return the cached vector for a text, or None on a miss.
+        """
+        return self.get_many(model, [text]).get(text)
+
+    def put_many(self, model: str, vectors: Dict[str, Sequence[float]]) -> Dict[str, "np.ndarray"]:
+        """
+        Store vectors by text for a model.
+
+        Returns:
+            Dict[str, np.ndarray]: The stored vectors as float32 arrays.
+        """
+        stored = {text: _as_vector(vector) for text, vector in vectors.items()}
+        with self._lock:
+            rows = []
+            for text, vector in stored.items():
+                text_hash = _text_hash(text)
+                self._remember((model, text_hash), vector)
+                rows.append((model, text_hash, self.dtype, len(vector), _pack(vector, self.dtype)))
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, dtype, dim, vector) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.commit()
+        return stored
+
+    def put(self, model: str, text: str, vector: Sequence[float]) -> "np.ndarray":
+        """
+        Store a single vector and return it as a float32 array.
+        """
+        return self.put_many(model, {text: vector})[text]
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters and number of stored vectors.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            stored = self._connection().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "stored": stored,
+                "lru_entries": len(self._lru),
+                "dtype": self.dtype,
+            }
+
+
+embedding_cache = EmbeddingCache()
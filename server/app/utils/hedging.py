@@ -0,0 +1,213 @@
+"""
+Hedged requests across providers for TTS and images.
+
+A hedged call starts the task's primary provider. If nothing comes back
+within the primary's recent p95 latency, it also starts the secondary
+provider, uses whichever answers first and cancels the other. If the primary
+fails, the secondary is always started as a fallback.
+
+Only the slowest ~5% of calls get hedged, so the extra cost stays small.
+HEDGE_MAX_RATIO also caps the share of calls that may be hedged, in case
+the primary gets slow across the board; fallbacks after a primary error do
+not count against it.
+
+Providers do not produce identical output (TTS voices, image sizes), so
+callers keep each provider's results apart in their caches.
+
+Per-task settings (TASK is TTS or IMAGE):
+
+    HEDGE_<TASK>_PRIMARY / HEDGE_<TASK>_SECONDARY   provider names; an empty secondary disables hedging
+    HEDGE_<TASK>_DELAY                              hedge delay (seconds) until enough latencies are known
+"""
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional
+
+# Shared hedging settings
+HEDGE_QUANTILE = float(os.getenv("HEDGE_QUANTILE", "0.95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_WINDOW = int(os.getenv("HEDGE_WINDOW", "200"))  # Latencies kept per provider
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.5"))
+HEDGE_MAX_RATIO = float(os.getenv("HEDGE_MAX_RATIO", "0.1"))
+
+# Default providers per task; the first is the provider the routers used before hedging
+DEFAULT_HEDGE_PROVIDERS = {
+    "tts": ("openai", "elice", 5.0),
+    "image": ("elice", "dalle", 15.0),
+}
+
+
+class LatencyTracker:
+    """
+    Latencies of a provider's recent calls: successes, and cancelled losers
+    as a lower bound of how long they would have taken.
+    """
+
+    def __init__(self, window: int = HEDGE_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        The q-quantile of the recent latencies, or None with too few samples.
+        """
+        with self._lock:
+            if len(self._samples) < HEDGE_MIN_SAMPLES:
+                return None
+            samples = sorted(self._samples)
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class Hedger:
+    """
+    Hedged calls of one task between a primary and a secondary provider.
+    """
+
+    def __init__(self, task: str, primary: str, secondary: Optional[str], initial_delay: float):
+        self.task = task
+        self.primary = primary
+        self.secondary = secondary or None
+        self.initial_delay = initial_delay
+        self.latencies: Dict[str, LatencyTracker] = {}
+        self._lock = threading.Lock()
+        # Counters for /stats/hedging
+        self.calls = 0
+        self.hedged = 0
+        self.fallbacks = 0
+        self.secondary_wins = 0
+        self.failures = 0
+
+    @classmethod
+    def from_env(cls, task: str) -> "Hedger":
+        primary, secondary, delay = DEFAULT_HEDGE_PROVIDERS[task]
+        prefix = f"HEDGE_{task.upper()}"
+        return cls(
+            task,
+            primary=os.getenv(f"{prefix}_PRIMARY", primary),
+            secondary=os.getenv(f"{prefix}_SECONDARY", secondary),
+            initial_delay=float(os.getenv(f"{prefix}_DELAY", str(delay))),
+        )
+
+    def _tracker(self, provider: str) -> LatencyTracker:
+        with self._lock:
+            return self.latencies.setdefault(provider, LatencyTracker())
+
+    def hedge_delay(self) -> float:
+        """
+        Seconds to wait for the primary before starting the secondary.
+        """
+        p95 = self._tracker(self.primary).quantile(HEDGE_QUANTILE)
+        return max(HEDGE_MIN_DELAY, p95 if p95 is not None else self.initial_delay)
+
+    def _may_hedge(self) -> bool:
+        with self._lock:
+            return self.secondary is not None and self.hedged < HEDGE_MAX_RATIO * self.calls + 1
+
+    async def _timed(self, provider: str, call: Callable[[], Awaitable]):
+        started = time.perf_counter()
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            # A cancelled loser took at least this long; keep it so the p95 is not biased low
+            self._tracker(provider).add(time.perf_counter() - started)
+            raise
+        self._tracker(provider).add(time.perf_counter() - started)
+        return result
+
+    async def run(self, calls: Dict[str, Callable[[], Awaitable]]):
+        """
+        Run the task's call on the primary provider, hedging to the secondary
+        when the primary is slow or fails.
+
+        Args:
+            calls (Dict[str, Callable]): Zero-argument coroutine functions by provider name.
+        Returns:
+            The result of the first provider to succeed.
+        """
+        with self._lock:
+            self.calls += 1
+        primary = asyncio.ensure_future(self._timed(self.primary, calls[self.primary]))
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay())
+            hedge = not done and self._may_hedge()
+            if not hedge:
+                # No speculative hedge: wait for the primary and fall back only if it fails
+                await asyncio.wait({primary})
+                if self.secondary is None or not primary.exception():
+                    return await primary
+
+            with self._lock:
+                if hedge:
+                    self.hedged += 1
+                else:
+                    self.fallbacks += 1
+            secondary = asyncio.ensure_future(self._timed(self.secondary, calls[self.secondary]))
+            try:
+                pending = {primary, secondary} if hedge else {secondary}
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if not task.exception():
+                            if task is secondary:
+                                with self._lock:
+                                    self.secondary_wins += 1
+                            return task.result()
+                # Both failed: report the primary's error
+                return await primary
+            finally:
+                _discard(secondary)
+        except BaseException:
+            with self._lock:
+                self.failures += 1
+            raise
+        finally:
+            _discard(primary)
+
+    def stats(self) -> dict:
+        hedge_delay = self.hedge_delay()
+        latencies = {
+            provider: {"samples": len(tracker), "p95": tracker.quantile(HEDGE_QUANTILE)}
+            for provider, tracker in list(self.latencies.items())
+        }
+        with self._lock:
+            return {
+                "primary": self.primary,
+                "secondary": self.secondary,
+                "hedge_delay": round(hedge_delay, 3),
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "fallbacks": self.fallbacks,
+                "secondary_wins": self.secondary_wins,
+                "failures": self.failures,
+                "latency": latencies,
+            }
+
+
+def _discard(task: asyncio.Future):
+    """
+    Cancel a call that lost the race, or consume its error if it already failed.
+    """
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled():
+        task.exception()
+
+
+hedgers = {task: Hedger.from_env(task) for task in DEFAULT_HEDGE_PROVIDERS}
+
+
+def hedging_stats() -> Dict[str, dict]:
+    """
+    Hedge counts and provider latencies of every hedged task.
+    """
+    return {task: hedger.stats() for task, hedger in hedgers.items()}
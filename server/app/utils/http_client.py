@@ -0,0 +1,128 @@
+"""
+Shared HTTP client for the non-OpenAI endpoints (Elice image/TTS, image downloads).
+
+The `httpx.AsyncClient` keeps a pool of keep-alive connections, applies
+per-endpoint connect/read timeouts and retries transient failures with the
+jittered backoff of `rate_limiter`, waiting for Retry-After when the server
+sends one. Every attempt passes through the endpoint's adaptive limiter, so
+each 429 shrinks the number of requests in flight.
+
+Generation endpoints are POSTs that cost money and are not idempotent, so
+retries follow `rate_limiter.is_retryable`: a POST is only retried when it
+surely was not processed (connection failures, 429 and 503).
+"""
+import os
+import asyncio
+from functools import lru_cache
+from typing import Tuple
+import httpx
+from app.utils.rate_limiter import backoff_delay, get_limiter, is_retryable, retry_after_seconds
+
+# Connection pool and keep-alive settings
+HTTP_POOL_MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "20"))
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+
+# Retry policy for transient failures (backoff settings are shared with `rate_limiter`)
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+
+# (connect, read) timeouts in seconds per endpoint
+ENDPOINT_TIMEOUTS = {
+    "elice_image": (
+        float(os.getenv("ELICE_IMAGE_CONNECT_TIMEOUT", "5")),
+        float(os.getenv("ELICE_IMAGE_READ_TIMEOUT", "60")),
+    ),
+    "elice_tts": (
+        float(os.getenv("ELICE_TTS_CONNECT_TIMEOUT", "5")),
+        float(os.getenv("ELICE_TTS_READ_TIMEOUT", "30")),
+    ),
+    "image_download": (
+        float(os.getenv("IMAGE_DOWNLOAD_CONNECT_TIMEOUT", "5")),
+        float(os.getenv("IMAGE_DOWNLOAD_READ_TIMEOUT", "30")),
+    ),
+}
+DEFAULT_TIMEOUT = (5.0, 30.0)
+
+# Requests per minute allowed per endpoint (unset: no fixed budget)
+ENDPOINT_RPM = {
+    "elice_image": os.getenv("ELICE_IMAGE_RPM"),
+    "elice_tts": os.getenv("ELICE_TTS_RPM"),
+}
+
+
+def timeout_for(endpoint: str) -> Tuple[float, float]:
+    """
+    (connect, read) timeout for an endpoint name.
+    """
+    return ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT)
+
+
+def limiter_for(endpoint: str):
+    """
+    Adaptive limiter shared by all requests to an endpoint name.
+    """
+    rpm = ENDPOINT_RPM.get(endpoint)
+    return get_limiter(endpoint, rpm=int(rpm) if rpm else None)
+
+
+@lru_cache(maxsize=8)
+def load_reference_audio(audio_path: str) -> bytes:
+    """
+    Read a reference audio file once and keep its bytes in memory.
+    """
+    with open(audio_path, "rb") as audio_file:
+        return audio_file.read()
+
+
+_async_client = None
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Pooled async client, created on first use.
+    """
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _async_client
+
+
+async def async_request(endpoint: str, method: str, url: str, **kwargs) -> httpx.Response:
+    """
+    Send a request through the pooled async client, retrying failures that
+    `is_retryable` allows with jittered backoff.
+
+    Args:
+        endpoint (str): Endpoint name used to pick timeouts (e.g. "elice_image").
+        method (str): HTTP method.
+        url (str): Request URL.
+    Returns:
+        httpx.Response: The final response after retries.
+    """
+    connect_timeout, read_timeout = timeout_for(endpoint)
+    timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+    client = get_async_client()
+    limiter = limiter_for(endpoint)
+
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        admitted = await limiter.acquire_async()
+        try:
+            response = await client.request(method, url, timeout=timeout, **kwargs)
+        except BaseException as e:
+            limiter.release(admitted)
+            if not is_retryable(method, error=e) or attempt == HTTP_MAX_RETRIES:
+                raise
+            retry_after = None
+        else:
+            retry_after = retry_after_seconds(response.headers)
+            limiter.release(admitted, response.status_code, retry_after)
+            if not is_retryable(method, status_code=response.status_code) or attempt == HTTP_MAX_RETRIES:
+                return response
+        limiter.note_retry()
+        await asyncio.sleep(backoff_delay(attempt, retry_after))
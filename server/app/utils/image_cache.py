@@ -0,0 +1,156 @@
+import os
+import json
+import random
+import sqlite3
+import hashlib
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import List, Optional
+
+# SQLite index of generated images, reuse policy (0 = off) and how many bytes
+# of images are offered for reuse. Image files are never deleted here.
+IMAGE_CACHE_PATH = os.getenv("IMAGE_CACHE_PATH", "./cache/image_cache.sqlite3")
+IMAGE_CACHE_REUSE_AFTER = int(os.getenv("IMAGE_CACHE_REUSE_AFTER", "0"))
+IMAGE_CACHE_REUSE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_REUSE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+def normalize_keywords(keywords: List[str]) -> List[str]:
+    """
+    Canonical keyword set: NFC-normalized, trimmed, lowercased, de-duplicated and sorted.
+    """
+    normalized = {unicodedata.normalize("NFC", keyword).strip().lower() for keyword in keywords}
+    return sorted(keyword for keyword in normalized if keyword)
+
+
+class ImageCache:
+    """
+    Index of generated record images keyed by (keyword set, provider, generation settings).
+
+    Reuse policy (`reuse_after`):
+        0  never reuse, every record gets a fresh image (default)
+        1  always reuse the first image generated for a keyword set
+        N  generate up to N different images per keyword set, then reuse a random one
+
+    The images themselves belong to the records that use them and are never
+    deleted here, so this does not bound disk usage. `reuse_max_bytes` only
+    caps how many bytes of images are offered for reuse; the least recently
+    used ones are dropped from the index first.
+    """
+
+    def __init__(self, path: str = IMAGE_CACHE_PATH, reuse_after: int = IMAGE_CACHE_REUSE_AFTER, reuse_max_bytes: int = IMAGE_CACHE_REUSE_MAX_BYTES):
+        self.path = path
+        self.reuse_after = reuse_after
+        self.reuse_max_bytes = reuse_max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Open the SQLite file on first use.
+        """
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS images ("
+                " cache_key TEXT NOT NULL,"
+                " url TEXT NOT NULL,"
+                " local_path TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " PRIMARY KEY (cache_key, url))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS images_last_used ON images (last_used)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(keywords: List[str], provider: str, **settings) -> str:
+        """
+        Hash the inputs that determine a generated image. Images of different
+        providers never share a key, since their sizes and look differ.
+        """
+        payload = json.dumps([normalize_keywords(keywords), provider, settings], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def choose(self, key: str) -> Optional[str]:
+        """
+        Pick an image to reuse for a key, or None when a new one should be generated.
+        """
+        if self.reuse_after <= 0:
+            return None
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute("SELECT url, local_path FROM images WHERE cache_key = ?", (key,)).fetchall()
+            # Forget images whose files were removed
+            missing = [url for url, local_path in rows if not os.path.exists(local_path)]
+            if missing:
+                conn.executemany("DELETE FROM images WHERE cache_key = ? AND url = ?", [(key, url) for url in missing])
+                conn.commit()
+                rows = [row for row in rows if row[0] not in missing]
+
+            if len(rows) < self.reuse_after:
+                self.misses += 1
+                return None
+
+            url = random.choice(rows)[0]
+            conn.execute("UPDATE images SET last_used = ? WHERE cache_key = ? AND url = ?", (time.time(), key, url))
+            conn.commit()
+            self.hits += 1
+            return url
+
+    def add(self, key: str, url: str, local_path: str):
+        """
+        Make a newly generated image available for reuse.
+        """
+        if self.reuse_after <= 0:
+            return
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO images (cache_key, url, local_path, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, url, local_path, os.path.getsize(local_path), time.time()),
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection):
+        """
+        Drop least recently used images from the index until it fits `reuse_max_bytes`.
+        """
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM images").fetchone()[0]
+        while total > self.reuse_max_bytes:
+            row = conn.execute("SELECT cache_key, url, size FROM images ORDER BY last_used LIMIT 1").fetchone()
+            if row is None:
+                break
+            conn.execute("DELETE FROM images WHERE cache_key = ? AND url = ?", row[:2])
+            total -= row[2]
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters and size of the reusable image set.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            entries, total = self._connection().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM images").fetchone()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": entries,
+                "reusable_bytes": total,
+                "reuse_max_bytes": self.reuse_max_bytes,
+                "reuse_after": self.reuse_after,
+            }
+
+
+image_cache = ImageCache()
@@ -0,0 +1,142 @@
+"""
+WebP variants of generated record images.
+
+Next to every `static/images/<uuid>.png` this writes
+
+    <uuid>.webp          full size WebP
+    <uuid>_medium.webp   longest side IMAGE_MEDIUM_SIZE
+    <uuid>_thumb.webp    longest side IMAGE_THUMB_SIZE
+
+Variants are found by file name, so existing image URLs in the database keep
+working and images generated before this existed only need a backfill
+(`python -m app.cli backfill-images`). Images whose variants are all known to
+exist are remembered, so list responses do not stat the files on every call.
+"""
+import os
+import threading
+from io import BytesIO
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# Variant sizes (longest side, pixels) and WebP encoder settings
+IMAGE_THUMB_SIZE = int(os.getenv("IMAGE_THUMB_SIZE", "160"))
+IMAGE_MEDIUM_SIZE = int(os.getenv("IMAGE_MEDIUM_SIZE", "512"))
+IMAGE_WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+IMAGE_WEBP_METHOD = int(os.getenv("IMAGE_WEBP_METHOD", "4"))  # 0 (fast) - 6 (smallest)
+# Number of images remembered as having every variant
+IMAGE_VARIANT_MEMO_SIZE = int(os.getenv("IMAGE_VARIANT_MEMO_SIZE", "50000"))
+
+VARIANT_SIZES = {
+    "medium": IMAGE_MEDIUM_SIZE,
+    "thumb": IMAGE_THUMB_SIZE,
+}
+
+STATIC_URL_PREFIX = "/static/"
+STATIC_DIR = "./static/"
+
+# Normalized "<dir>/<uuid>" of images whose variants have all been written or seen
+_complete: set = set()
+_complete_lock = threading.Lock()
+
+
+def _variant_file_name(base_name: str, variant: str) -> str:
+    return f"{base_name}.webp" if variant == "webp" else f"{base_name}_{variant}.webp"
+
+
+def _variant_key(directory: str, base_name: str) -> str:
+    return os.path.normpath(os.path.join(directory, base_name))
+
+
+def _remember_complete(key: str):
+    with _complete_lock:
+        if len(_complete) >= IMAGE_VARIANT_MEMO_SIZE:
+            _complete.clear()
+        _complete.add(key)
+
+
+def forget_variants(image_path: str):
+    """
+    Drop the remembered variants of an image, e.g. after deleting its files.
+    """
+    directory, file_name = os.path.split(image_path)
+    with _complete_lock:
+        _complete.discard(_variant_key(directory, os.path.splitext(file_name)[0]))
+
+
+def _encode_webp(image: "Image.Image") -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, format="WEBP", quality=IMAGE_WEBP_QUALITY, method=IMAGE_WEBP_METHOD)
+    return buffer.getvalue()
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(data)
+    os.replace(tmp_path, path)
+
+
+def create_variants(image_path: str) -> Dict[str, str]:
+    """
+    Write the WebP original and resized variants next to a saved image.
+    Images are never upscaled, so small sources keep their size.
+
+    Args:
+        image_path (str): Local path of the source image.
+    Returns:
+        Dict[str, str]: Local file path by variant name ("webp", "medium", "thumb").
+    """
+    from PIL import Image
+
+    directory, file_name = os.path.split(image_path)
+    base_name = os.path.splitext(file_name)[0]
+
+    with Image.open(image_path) as source:
+        source.load()
+        image = source.convert("RGBA" if source.mode in ("RGBA", "LA", "P") else "RGB")
+
+    paths = {}
+    path = os.path.join(directory, _variant_file_name(base_name, "webp"))
+    _write_atomic(path, _encode_webp(image))
+    paths["webp"] = path
+
+    for variant, size in VARIANT_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        path = os.path.join(directory, _variant_file_name(base_name, variant))
+        _write_atomic(path, _encode_webp(resized))
+        paths[variant] = path
+    _remember_complete(_variant_key(directory, base_name))
+    return paths
+
+
+def variant_urls(image_url: Optional[str]) -> Optional[Dict[str, str]]:
+    """
+    URLs of the variants that exist for an image URL under /static/.
+
+    Args:
+        image_url (str): URL of the original image, e.g. "/static/images/<uuid>.png".
+    Returns:
+        Optional[Dict[str, str]]: URL by variant name, including "original",
+        or None when there is no image.
+    """
+    if not image_url:
+        return None
+    urls = {"original": image_url}
+    if not image_url.startswith(STATIC_URL_PREFIX):
+        return urls
+
+    relative_dir, file_name = os.path.split(image_url[len(STATIC_URL_PREFIX):])
+    base_name = os.path.splitext(file_name)[0]
+    key = _variant_key(os.path.join(STATIC_DIR, relative_dir), base_name)
+    known = key in _complete
+    for variant in ("webp", *VARIANT_SIZES):
+        variant_name = _variant_file_name(base_name, variant)
+        if known or os.path.exists(os.path.join(STATIC_DIR, relative_dir, variant_name)):
+            urls[variant] = f"{STATIC_URL_PREFIX}{relative_dir}/{variant_name}"
+    if not known and len(urls) == len(VARIANT_SIZES) + 2:
+        # Only complete sets are remembered, so a later backfill still shows up
+        _remember_complete(key)
+    return urls
@@ -1,177 +1,118 @@
-from openai import OpenAI
-client = OpenAI()
-
+"""
+Prompts, response parsers and file helpers shared by the AI calls in
+`async_openai_client`: Elice request settings, image and TTS file writing,
+transcription keys, chat message builders and embedding batching.
+"""
 import os
-from typing import List
-import requests
+import logging
+from typing import List, Optional
 from uuid import uuid4
-import base64
-from pathlib import Path
-# Load OpenAI API key from environment variables
-client.api_key = os.getenv("OPENAI_API_KEY")
+import hashlib
+from app import schemas
+from app.utils.providers import providers
+from app.utils.image_variants import create_variants
+from app.utils.transcription_cache import transcription_cache
+
+logger = logging.getLogger(__name__)
+
 ELICE_API_URL = os.getenv("ELICE_API_URL")
 ELICE_API_TOKEN = os.getenv("ELICE_API_TOKEN")
 ELICE_TTS_API_URL = os.getenv("ELICE_TTS_API_URL")
+# Request limits for batched embedding calls
+EMBEDDING_BATCH_MAX_INPUTS = int(os.getenv("EMBEDDING_BATCH_MAX_INPUTS", "2048"))
+EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "250000"))
+
 
-def generate_tts_openai(text: str, save_dir: str = "./static/tts/", file_name: str = "openai_tts.mp3") -> str:
+def _elice_headers() -> dict:
     """
-    Generate speech from text using OpenAI's TTS API.
+    Authorization headers shared by the Elice API endpoints.
+    """
+    return {
+        "accept": "application/json",
+        "Authorization": f"Bearer {ELICE_API_TOKEN}"
+    }
+
 
-    Args:
-        text (str): Text to synthesize into speech.
-        save_dir (str): Directory to save the generated TTS audio (default: "./static/tts/").
-        file_name (str): Name of the output TTS audio file (default: "openai_tts.mp3").
+def _save_image(image_bytes: bytes, save_dir: str = "./static/images/") -> str:
+    """
+    Save image bytes under a unique file name, together with its WebP variants.
 
     Returns:
-        str: Path to the saved TTS audio file.
+        str: Relative path to the saved image.
     """
     # Ensure the save directory exists
-    save_dir_path = Path(save_dir)
-    save_dir_path.mkdir(parents=True, exist_ok=True)
+    os.makedirs(save_dir, exist_ok=True)
 
-    # Define the path for the generated TTS file
-    speech_file_path = save_dir_path / file_name
+    # Create a unique file name
+    file_name = f"{uuid4()}.png"
+    local_file_path = os.path.join(save_dir, file_name)
+    with open(local_file_path, "wb") as file:
+        file.write(image_bytes)
 
-    # Call OpenAI's TTS API
-    response = client.audio.speech.create(
-        model="tts-1",
-        voice="nova",
-        input=text
-    )
+    # Write WebP, medium and thumbnail variants next to the original
+    try:
+        create_variants(local_file_path)
+    except Exception as e:
+        logger.warning("Image variant generation failed for %s: %s", local_file_path, e)
 
-    # Stream the generated audio to the specified file path
-    response.stream_to_file(speech_file_path)
+    # Return the relative path for the API response
+    return f"/static/images/{file_name}"
 
-    return str(speech_file_path)
 
-def generate_tts(text: str, audio_path: str = "./app/reference_audio.mp3", save_dir: str = "./static/tts/") -> str:
+def _elice_tts_file_name(text: str, audio_path: str) -> str:
     """
-    Generate speech from text using the Elice TTS API.
+    File name of the Elice TTS audio for a text, so different texts never overwrite each other.
+    """
+    reference_name = os.path.basename(audio_path)
+    digest = hashlib.sha256(f"{reference_name}\n{text}".encode("utf-8")).hexdigest()[:16]
+    return f"{os.path.splitext(reference_name)[0]}_{digest}_tts.mp3"
 
-    Args:
-        audio_path (str): Path to the reference audio file.
-        text (str): Text to synthesize into speech.
-        save_dir (str): Directory to save the generated TTS audio (default: "./static/tts/").
 
-    Returns:
-        str: Relative path to the saved TTS audio file.
+def _write_file_atomic(path: str, data: bytes):
     """
-    # Ensure the save directory exists
-    os.makedirs(save_dir, exist_ok=True)
-
-    # Prepare files and payload for the API request
-    files = {
-        "audio": (os.path.basename(audio_path), open(audio_path, "rb"), "audio/mpeg")
-    }
-    payload = {
-        "text": text
-    }
-    headers = {
-        "accept": "application/json",
-        "Authorization": f"Bearer {ELICE_API_TOKEN}"
-    }
+    Write through a temp file so readers never see a partial file.
+    """
+    temp_path = f"{path}.{uuid4().hex}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(data)
+    os.replace(temp_path, path)
 
-    # Send the request to the Elice API
-    response = requests.post(ELICE_TTS_API_URL, files=files, data=payload, headers=headers)
 
-    # Check for a successful response
-    if response.status_code != 200:
-        raise Exception(f"TTS generation failed with status code {response.status_code}: {response.text}")
+def _file_sha256(file_path: str) -> str:
+    """
+    Hash a file in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        while chunk := file.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-    # Decode and save the TTS audio file
-    tts_audio_data = response.content
-    file_name = os.path.basename(audio_path).replace(".mp3", "_tts.mp3")
-    local_file_path = os.path.join(save_dir, file_name)
 
-    with open(local_file_path, "wb") as file:
-        file.write(tts_audio_data)
+def _transcription_key(file_path: str, audio_sha256: Optional[str] = None) -> str:
+    """
+    Single-flight key of a transcription: the audio hash when known.
+    """
+    return audio_sha256 or file_path
 
-    # Return the relative path for API response
-    return f"{save_dir}/{file_name}"
 
-def generate_image_elice(prompt: str, style: str = "oil_painting", width: int = 256, height: int = 256, steps: int = 4, num: int = 1, save_dir: str = "./static/images/") -> str:
+def cached_transcription(audio_sha256: str) -> Optional[str]:
     """
-    Generate an image using the Elice AI Hellothon API and save it locally.
-    
-    Args:
-        prompt (str): Description of the image to generate.
-        style (str): Style of the image (default: "polaroid").
-        width (int): Width of the generated image (default: 256).
-        height (int): Height of the generated image (default: 256).
-        steps (int): Number of diffusion steps (default: 1).
-        num (int): Number of images to generate (default: 1).
-        save_dir (str): Directory to save the image (default: "./static/images/").
-    
-    Returns:
-        str: Relative path to the saved image.
+    Return the cached transcription of audio with this hash, or None.
     """
-    # Ensure the save directory exists
-    os.makedirs(save_dir, exist_ok=True)
-    
-    # API request payload
-    payload = {
-        "prompt": prompt,
-        "style": style,
-        "width": width,
-        "height": height,
-        "steps": steps,
-        "num": num
-    }
-    
-    headers = {
-        "Authorization": f"Bearer {ELICE_API_TOKEN}",
-        "accept": "application/json",
-        "content-type": "application/json"
-    }
-    
-    # Send the request to the Elice API
-    response = requests.post(ELICE_API_URL, headers=headers, json=payload)
-    
-    # Check for a successful response
-    if response.status_code != 200:
-        raise Exception(f"Image generation failed with status code {response.status_code}: {response.text}")
-    
-    # Decode the Base64 image
-    image_data = response.json().get("predictions")
-    if not image_data:
-        raise Exception("No image data received from the API.")
-    
-    # Save the image locally
-    file_name = f"{uuid4()}.png"
-    local_file_path = os.path.join(save_dir, file_name)
-    with open(local_file_path, "wb") as file:
-        file.write(base64.b64decode(image_data))
-    
-    # Return the relative path for the API response
-    return f"/static/images/{file_name}"
+    return transcription_cache.get(providers.model("stt"), audio_sha256)
+
 
-def transcribe_audio(file_path: str) -> str:
+def _join_transcripts(texts: List[str]) -> str:
     """
-    Transcribe audio using OpenAI Whisper.
-    Args:
-        file_path (str): Path to the audio file.
-    Returns:
-        str: The transcribed text.
+    Stitch chunk transcriptions back together in order.
     """
-    with open(file_path, "rb") as audio_file:
-        print(audio_file)
-        response = client.audio.transcriptions.create(
-            model="whisper-1",
-            file=audio_file,
-        )
-        print(response)
-    return response.text
+    return " ".join(text.strip() for text in texts if text and text.strip())
 
 
-def summarize_text(content: str) -> str:
+def _summary_messages(content: str) -> List[dict]:
     """
-    질의와 응답을 바탕으로 꼬리 질문이 이어진 노인의 일기 형식으로 텍스트를 재구성합니다.
-
-    Args:
-        content (str): 질의-응답 형식의 원문 텍스트.
-    
-    Returns:
-        str: 노인의 일기 형식으로 변환된 텍스트.
+    Build the chat messages for `summarize_text`.
     """
     example = """
     예시:
@@ -201,23 +142,15 @@ def summarize_text(content: str) -> str:
 
     결과 (일기 형식):
     """
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": "너는 노인들의 이야기를 일기 형식으로 재구성하는 따뜻한 어시스턴트입니다."},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    return response.choices[0].message.content.strip()
+    return [
+        {"role": "system", "content": "너는 노인들의 이야기를 일기 형식으로 재구성하는 따뜻한 어시스턴트입니다."},
+        {"role": "user", "content": prompt}
+    ]
 
 
-def generate_title(content: str) -> str:
+def _title_messages(content: str) -> List[dict]:
     """
-    주어진 텍스트 내용을 바탕으로 적절한 제목을 생성합니다.
-    Args:
-        content (str): 제목을 생성할 텍스트.
-    Returns:
-        str: 생성된 제목.
+    Build the chat messages for `generate_title`.
     """
     example = """
     예시:
@@ -237,24 +170,15 @@ def generate_title(content: str) -> str:
 
     생성된 제목:
     """
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": "너는 주어진 텍스트에 적합한 제목을 만드는 능숙한 어시스턴트입니다."},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    return response.choices[0].message.content.strip()
-
+    return [
+        {"role": "system", "content": "너는 주어진 텍스트에 적합한 제목을 만드는 능숙한 어시스턴트입니다."},
+        {"role": "user", "content": prompt}
+    ]
 
 
-def extract_keywords(content: str) -> List[str]:
+def _keyword_messages(content: str) -> List[dict]:
     """
-    주어진 텍스트에서 최대 5개의 핵심 키워드를 추출합니다.
-    Args:
-        content (str): 키워드를 추출할 텍스트.
-    Returns:
-        List[str]: 추출된 키워드 리스트 (최대 5개).
+    Build the chat messages for `extract_keywords`.
     """
     example = """
     예시:
@@ -276,65 +200,75 @@ def extract_keywords(content: str) -> List[str]:
 
     생성된 키워드:
     """
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": "너는 주어진 텍스트에서 중요한 키워드를 추출하는 능숙한 어시스턴트입니다."},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    # 결과를 쉼표로 구분된 키워드로 반환
-    keywords_text = response.choices[0].message.content.strip()
-    print("Keywords: ", keywords_text)
+    return [
+        {"role": "system", "content": "너는 주어진 텍스트에서 중요한 키워드를 추출하는 능숙한 어시스턴트입니다."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _parse_keywords(keywords_text: str) -> List[str]:
+    """
+    Split the comma separated model output into at most 5 keywords.
+    """
+    logger.debug("Keywords: %s", keywords_text)
     return [keyword.strip() for keyword in keywords_text.split(",")][:5]  # 최대 5개의 키워드만 반환
 
 
-def generate_image(prompt: str, size: str = "1024x1024", save_dir: str = "./static/images/") -> str:
+def _record_draft_messages(content: str) -> List[dict]:
     """
-    Generate an image using OpenAI DALL-E and save it locally.
-    
-    Args:
-        prompt (str): Description of the image to generate.
-        size (str): Image size (default: "1024x1024").
-        save_dir (str): Directory to save the image (default: "./static/images/").
-        
-    Returns:
-        str: Relative path to the saved image.
+    Build the chat messages for `generate_record_draft`.
+    The diary instructions are the same as `_summary_messages`; title and
+    keywords are derived from the diary within the same response.
+    """
+    messages = _summary_messages(content)
+    messages[0] = {"role": "system", "content": "너는 노인들의 이야기를 일기 형식으로 재구성하고, 그 일기에 어울리는 제목과 키워드를 만드는 따뜻한 어시스턴트입니다."}
+    messages[1]["content"] += """
+    일기를 작성한 뒤, 그 일기를 바탕으로 다음 항목도 함께 작성하세요.
+    - title: 일기 내용을 잘 반영하는 간결하고 매력적인 한 줄 제목 (특수문자 제외)
+    - keywords: 일기에서 가장 중요한 키워드 최대 5개 (중복되거나 관련 없는 단어 제외)
+    결과는 summary(일기), title, keywords 필드를 가진 JSON으로 반환하세요.
     """
-    response = client.images.generate(
-        model="dall-e-3",
-        prompt=prompt,
-        size=size,
-        quality="standard",
-        n=1
+    return messages
+
+
+# Strict JSON schema for `schemas.RecordDraft`
+RECORD_DRAFT_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "record_draft",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "summary": {"type": "string"},
+                "title": {"type": "string"},
+                "keywords": {"type": "array", "items": {"type": "string"}},
+            },
+            "required": ["summary", "title", "keywords"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+def _parse_record_draft(message) -> schemas.RecordDraft:
+    """
+    Validate the structured-output message into a `RecordDraft`.
+    """
+    if getattr(message, "refusal", None):
+        raise Exception(f"Record draft generation was refused: {message.refusal}")
+    draft = schemas.RecordDraft.model_validate_json(message.content)
+    keywords = [keyword.strip() for keyword in draft.keywords if keyword.strip()]
+    return schemas.RecordDraft(
+        summary=draft.summary.strip(),
+        title=draft.title.strip(),
+        keywords=list(dict.fromkeys(keywords))[:5],  # 최대 5개의 키워드만 반환
     )
-    
-    # Get the image URL
-    image_url = response.data[0].url
-    
-    # Ensure the directory exists
-    os.makedirs(save_dir, exist_ok=True)
-    
-    # Create a unique file name
-    file_name = f"{uuid4()}.png"
-    local_file_path = os.path.join(save_dir, file_name)
-    
-    # Download and save the image locally
-    response = requests.get(image_url)
-    with open(local_file_path, "wb") as file:
-        file.write(response.content)
-    
-    # Return the relative path for API response
-    return f"/static/images/{file_name}"
 
 
-def generate_follow_up_question(question_answer_pairs: List[dict]) -> str:
+def _follow_up_messages(question_answer_pairs: List[dict]) -> List[dict]:
     """
-    Generate a follow-up question with empathy and continuity using OpenAI GPT.
-    Args:
-        question_answer_pairs (List[dict]): List of question-answer pairs.
-    Returns:
-        str: Empathetic response and a follow-up question.
+    Build the chat messages for `generate_follow_up_question`.
     """
     example = """
     예시:
@@ -364,22 +298,35 @@ def generate_follow_up_question(question_answer_pairs: List[dict]) -> str:
 
     공감과 꼬리 질문:
     """
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": "너는 노인들과의 대화를 이어가는 따뜻하고 공감 능력이 뛰어난 어시스턴트입니다."},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    return response.choices[0].message.content.strip()
+    return [
+        {"role": "system", "content": "너는 노인들과의 대화를 이어가는 따뜻하고 공감 능력이 뛰어난 어시스턴트입니다."},
+        {"role": "user", "content": prompt}
+    ]
 
 
-def get_text_embedding(text: str) -> List[float]:
+def _estimate_tokens(text: str) -> int:
     """
-    Get the embedding for a given text using OpenAI's embedding model.
+    Conservative token estimate used to keep embedding batches under the request limit.
     """
-    response = client.embeddings.create(
-        input=text,
-        model="text-embedding-3-small"
-    )
-    return response.data[0].embedding
+    return len(text.encode("utf-8")) // 2 + 1
+
+
+def _embedding_batches(texts: List[str]) -> List[List[str]]:
+    """
+    Split texts into batches that respect the per-request input and token limits.
+    """
+    batches = []
+    batch = []
+    batch_tokens = 0
+    for text in texts:
+        tokens = _estimate_tokens(text)
+        if batch and (len(batch) >= EMBEDDING_BATCH_MAX_INPUTS or batch_tokens + tokens > EMBEDDING_BATCH_MAX_TOKENS):
+            batches.append(batch)
+            batch = []
+            batch_tokens = 0
+        batch.append(text)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
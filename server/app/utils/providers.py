@@ -0,0 +1,216 @@
+"""
+Per-task LLM/embedding/speech provider registry.
+
+Each task (summary, title, keywords, diary, follow_up, embedding, tts, stt, image)
+resolves to a base URL, API key, model, timeout and concurrency limit, so
+latency-sensitive tasks can be routed to the local vLLM servers started by
+`vllm_serve.sh` while the rest stay on OpenAI.
+
+Configuration is read from environment variables, most specific first:
+
+    AI_<TASK>_BASE_URL / AI_<TASK>_API_KEY / AI_<TASK>_MODEL
+    AI_<TASK>_TIMEOUT / AI_<TASK>_CONCURRENCY / AI_<TASK>_PROVIDER
+    AI_<TASK>_RPM / AI_<TASK>_TPM
+    AI_BASE_URL / AI_API_KEY / AI_TIMEOUT / AI_CONCURRENCY / AI_RPM / AI_TPM   (all tasks)
+
+or from a JSON file named by AI_PROVIDERS_FILE, e.g.
+
+    {
+        "follow_up": {"provider": "vllm", "base_url": "http://localhost:8000/v1",
+                      "api_key": "token-abc123", "model": "meta-llama/Meta-Llama-3-70B-Instruct"},
+        "embedding": {"provider": "vllm", "base_url": "http://localhost:8001/v1",
+                      "api_key": "token-def456", "model": "BAAI/bge-multilingual-gemma2"}
+    }
+
+Environment variables override the file. Clients are created lazily on
+first use and shared between tasks that point at the same endpoint.
+
+Requests go through the endpoint's adaptive rate limiter (see `rate_limiter`),
+which also does the retrying. Its requests/min and tokens/min budgets come
+from the first task that uses the endpoint; unset means no fixed budget.
+"""
+import os
+import json
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, replace
+from typing import Dict, Optional
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from openai._constants import DEFAULT_CONNECTION_LIMITS
+from app.utils.rate_limiter import AsyncRateLimitedTransport, get_limiter
+from app.metrics import async_token_usage_hook
+
+# Default model for every task when nothing else is configured
+DEFAULT_MODELS = {
+    "summary": "gpt-4o",
+    "title": "gpt-4o",
+    "keywords": "gpt-4o",
+    "diary": "gpt-4o",
+    "follow_up": "gpt-4o",
+    "embedding": "text-embedding-3-small",
+    "tts": "tts-1",
+    "stt": "whisper-1",
+    "image": "dall-e-3",
+}
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_CONCURRENCY = 16
+
+
+@dataclass(frozen=True)
+class ProviderConfig:
+    """
+    Where and how a task's requests are sent.
+    """
+    task: str
+    provider: str
+    model: str
+    base_url: Optional[str] = None
+    api_key: Optional[str] = None
+    timeout: float = DEFAULT_TIMEOUT
+    concurrency: int = DEFAULT_CONCURRENCY
+    rpm: Optional[int] = None  # Requests per minute allowed by the provider
+    tpm: Optional[int] = None  # Tokens per minute allowed by the provider
+
+
+def _setting(task: str, name: str, entry: dict, default=None):
+    """
+    Resolve one setting: AI_<TASK>_<NAME>, then the providers file, then AI_<NAME>.
+    """
+    return (
+        os.getenv(f"AI_{task.upper()}_{name.upper()}")
+        or entry.get(name)
+        or os.getenv(f"AI_{name.upper()}")
+        or default
+    )
+
+
+def _int_or_none(value) -> Optional[int]:
+    return int(value) if value else None
+
+
+def load_configs() -> Dict[str, ProviderConfig]:
+    """
+    Build the provider config of every task from AI_PROVIDERS_FILE and the environment.
+    """
+    file_configs = {}
+    providers_file = os.getenv("AI_PROVIDERS_FILE")
+    if providers_file:
+        with open(providers_file, encoding="utf-8") as file:
+            file_configs = json.load(file)
+
+    configs = {}
+    for task, default_model in DEFAULT_MODELS.items():
+        entry = file_configs.get(task, {})
+        base_url = _setting(task, "base_url", entry)
+        configs[task] = ProviderConfig(
+            task=task,
+            provider=_setting(task, "provider", entry, "custom" if base_url else "openai"),
+            model=os.getenv(f"AI_{task.upper()}_MODEL") or entry.get("model") or default_model,
+            base_url=base_url,
+            api_key=_setting(task, "api_key", entry),
+            timeout=float(_setting(task, "timeout", entry, DEFAULT_TIMEOUT)),
+            concurrency=int(_setting(task, "concurrency", entry, DEFAULT_CONCURRENCY)),
+            rpm=_int_or_none(_setting(task, "rpm", entry)),
+            tpm=_int_or_none(_setting(task, "tpm", entry)),
+        )
+    return configs
+
+
+class ProviderRegistry:
+    """
+    Resolves tasks to provider configs, shared OpenAI-compatible clients and
+    concurrency slots.
+    """
+
+    def __init__(self, configs: Dict[str, ProviderConfig]):
+        self._configs = dict(configs)
+        self._lock = threading.Lock()
+        self._async_clients = {}
+        self._async_semaphores = {}
+
+    @classmethod
+    def from_env(cls) -> "ProviderRegistry":
+        return cls(load_configs())
+
+    def config(self, task: str) -> ProviderConfig:
+        """
+        Provider config for a task.
+        """
+        try:
+            return self._configs[task]
+        except KeyError:
+            raise KeyError(f"Unknown AI task: {task}")
+
+    def configure(self, task: str, **changes) -> ProviderConfig:
+        """
+        Override fields of a task's config at runtime (e.g. in tests).
+        """
+        with self._lock:
+            config = replace(self._configs[task], **changes)
+            self._configs[task] = config
+            self._async_semaphores.pop(task, None)
+        return config
+
+    def model(self, task: str) -> str:
+        return self.config(task).model
+
+    @staticmethod
+    def _client_key(config: ProviderConfig) -> tuple:
+        return (config.base_url, config.api_key, config.timeout)
+
+    @staticmethod
+    def limiter(config: ProviderConfig):
+        """
+        Rate limiter shared by every client of the config's endpoint.
+        """
+        return get_limiter(f"{config.provider}:{config.base_url or 'api.openai.com'}", rpm=config.rpm, tpm=config.tpm)
+
+    def async_client(self, task: str) -> AsyncOpenAI:
+        """
+        Async client for a task, created on first use.
+        """
+        config = self.config(task)
+        key = self._client_key(config)
+        with self._lock:
+            if key not in self._async_clients:
+                transport = AsyncRateLimitedTransport(self.limiter(config), httpx.AsyncHTTPTransport(limits=DEFAULT_CONNECTION_LIMITS))
+                self._async_clients[key] = AsyncOpenAI(
+                    base_url=config.base_url, api_key=config.api_key, timeout=config.timeout,
+                    max_retries=0,
+                    http_client=DefaultAsyncHttpxClient(transport=transport, event_hooks={"response": [async_token_usage_hook(config.provider)]}),
+                )
+            return self._async_clients[key]
+
+    @asynccontextmanager
+    async def async_slot(self, task: str):
+        """
+        Hold one of the task's concurrency slots for an async call.
+        """
+        with self._lock:
+            if task not in self._async_semaphores:
+                self._async_semaphores[task] = asyncio.Semaphore(self.config(task).concurrency)
+            semaphore = self._async_semaphores[task]
+        async with semaphore:
+            yield
+
+    def describe(self) -> Dict[str, dict]:
+        """
+        Task routing without secrets, for diagnostics.
+        """
+        return {
+            task: {
+                "provider": config.provider,
+                "model": config.model,
+                "base_url": config.base_url,
+                "timeout": config.timeout,
+                "concurrency": config.concurrency,
+                "rpm": config.rpm,
+                "tpm": config.tpm,
+            }
+            for task, config in self._configs.items()
+        }
+
+
+providers = ProviderRegistry.from_env()
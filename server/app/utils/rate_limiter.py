@@ -0,0 +1,327 @@
+"""
+Adaptive outbound rate limiting for AI provider calls.
+
+Every OpenAI-compatible client built by `providers` sends its requests
+through an `AsyncRateLimitedTransport` (the Elice calls in `http_client`
+use the same limiters directly). For each request this:
+
+- waits on per-provider token buckets for requests/min and tokens/min,
+  when AI_RPM / AI_TPM (or the per-task variants) are set;
+- limits how many requests are in flight with an AIMD window. The window
+  shrinks by half when the provider answers 429 and grows back by one
+  request per window of successes;
+- retries failures with jittered exponential backoff, waiting for the
+  provider's Retry-After when one is sent and pausing every caller of that
+  provider until then. Chat, image, speech and transcription requests are
+  paid, non-idempotent POSTs, so a POST is only retried when it surely was
+  not processed: 429, 503 and errors before the request was sent (see
+  `is_retryable`). Other methods are also retried on read errors and 5xx.
+
+The SDK's own retries are turned off (max_retries=0), so each request is
+retried in one place only.
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+import httpx
+
+# Retry policy
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "5"))
+RATE_LIMIT_BACKOFF_BASE = float(os.getenv("RATE_LIMIT_BACKOFF_BASE", "0.5"))
+RATE_LIMIT_BACKOFF_MAX = float(os.getenv("RATE_LIMIT_BACKOFF_MAX", "30"))
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# Responses that mean a non-idempotent request was not processed
+POST_RETRY_STATUS_CODES = (429, 503)
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+# Bounds of the adaptive in-flight window per provider
+RATE_LIMIT_MAX_CONCURRENCY = int(os.getenv("RATE_LIMIT_MAX_CONCURRENCY", "32"))
+RATE_LIMIT_MIN_CONCURRENCY = int(os.getenv("RATE_LIMIT_MIN_CONCURRENCY", "1"))
+
+# Request paths whose JSON body counts against the tokens/min budget
+_TOKEN_PATHS = ("/chat/completions", "/completions", "/embeddings")
+
+
+class TokenBucket:
+    """
+    Continuously refilled budget of `per_minute` units, e.g. requests or tokens.
+
+    Callers reserve units up front; the balance may go negative, and the
+    returned delay is how long the caller has to wait for its reservation.
+    This keeps callers in arrival order without a queue.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self._available = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take `amount` units and return the seconds to wait before using them.
+        """
+        amount = min(amount, self.capacity)  # An oversized request waits for a full bucket, not forever
+        with self._lock:
+            now = time.monotonic()
+            self._available = min(self.capacity, self._available + (now - self._updated) * self.rate)
+            self._updated = now
+            self._available -= amount
+            return max(0.0, -self._available / self.rate)
+
+
+def retry_after_seconds(headers) -> Optional[float]:
+    """
+    Delay requested by the provider in `retry-after-ms` or `Retry-After`
+    (seconds or an HTTP date), or None.
+    """
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """
+    Seconds to wait before retry `attempt` (0-based): the provider's
+    Retry-After when given, else full-jitter exponential backoff.
+    """
+    if retry_after is not None:
+        return min(retry_after, RATE_LIMIT_BACKOFF_MAX)
+    return random.uniform(0, min(RATE_LIMIT_BACKOFF_MAX, RATE_LIMIT_BACKOFF_BASE * (2 ** attempt)))
+
+
+def is_retryable(method: str, status_code: Optional[int] = None, error: Optional[BaseException] = None) -> bool:
+    """
+    Whether a failed attempt may be sent again.
+
+    Args:
+        method (str): HTTP method of the request.
+        status_code (int): Response status, when a response arrived.
+        error (BaseException): Exception raised instead of a response.
+    """
+    idempotent = method.upper() in IDEMPOTENT_METHODS
+    if error is not None:
+        if idempotent:
+            return isinstance(error, httpx.TransportError)
+        # The request never reached the server
+        return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+    return status_code in (RETRY_STATUS_CODES if idempotent else POST_RETRY_STATUS_CODES)
+
+
+def estimate_request_tokens(request: httpx.Request) -> int:
+    """
+    Conservative token count of a chat/embedding request: its input text plus
+    the completion budget it asks for. Other requests count as 0.
+    """
+    if not request.url.path.endswith(_TOKEN_PATHS):
+        return 0
+    try:
+        body = json.loads(request.content)
+    except (httpx.RequestNotRead, ValueError):
+        return 0
+    text = json.dumps(body.get("messages") or body.get("input") or body.get("prompt") or "", ensure_ascii=False)
+    completion = body.get("max_completion_tokens") or body.get("max_tokens") or 0
+    return len(text.encode("utf-8")) // 2 + 1 + int(completion)
+
+
+class AdaptiveLimiter:
+    """
+    Request/token budgets and adaptive in-flight window of one provider.
+    """
+
+    def __init__(self, name: str, rpm: Optional[int] = None, tpm: Optional[int] = None,
+                 max_concurrency: int = RATE_LIMIT_MAX_CONCURRENCY, min_concurrency: int = RATE_LIMIT_MIN_CONCURRENCY):
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min(min_concurrency, max_concurrency)
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self._async_waiters = []
+        # Counters for /stats/rate_limits
+        self.sent = 0
+        self.throttled = 0
+        self.retries = 0
+        self.failures = 0
+        self.wait_seconds = 0.0
+
+    def _budget_delay(self, tokens: int) -> float:
+        delay = self.requests.reserve(1) if self.requests else 0.0
+        if self.tokens and tokens:
+            delay = max(delay, self.tokens.reserve(tokens))
+        return delay
+
+    def _try_admit(self) -> Optional[float]:
+        """
+        Take an in-flight slot. Returns None when admitted, else how long to
+        wait at most before trying again (0 means until a slot is released).
+        """
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.in_flight < int(self.limit):
+            self.in_flight += 1
+            self.sent += 1
+            return None
+        return 0.0
+
+    async def acquire_async(self, tokens: int = 0) -> float:
+        """
+        Wait until the request fits the budgets and the in-flight window.
+
+        Returns:
+            float: When the request was admitted; pass it back to `release`.
+        """
+        started = time.monotonic()
+        delay = self._budget_delay(tokens)
+        if delay:
+            await asyncio.sleep(delay)
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                wait = self._try_admit()
+                if wait is None:
+                    admitted = time.monotonic()
+                    self.wait_seconds += admitted - started
+                    return admitted
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            try:
+                await asyncio.wait_for(waiter, wait or None)
+            except asyncio.TimeoutError:
+                pass
+
+    def release(self, admitted: float, status: Optional[int] = None, retry_after: Optional[float] = None):
+        """
+        Free the in-flight slot and adapt the window to the outcome.
+
+        Args:
+            admitted (float): Value returned by `acquire_async` for this request.
+            status (int): Response status, or None when the request failed without one.
+            retry_after (float): Delay the provider asked for, in seconds.
+        """
+        with self._lock:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if status == 429:
+                self.throttled += 1
+                # One cut per burst: 429s for requests sent before the last cut are already accounted for
+                if admitted > self._last_decrease:
+                    self.limit = max(float(self.min_concurrency), self.limit / 2)
+                    self._last_decrease = now
+                if retry_after:
+                    self._paused_until = max(self._paused_until, now + min(retry_after, RATE_LIMIT_BACKOFF_MAX))
+            elif status is not None and status < 500:
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            else:
+                self.failures += 1
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+
+    def note_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rpm": self.requests.capacity if self.requests else None,
+                "tpm": self.tokens.capacity if self.tokens else None,
+                "concurrency_limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "sent": self.sent,
+                "throttled": self.throttled,
+                "retries": self.retries,
+                "failures": self.failures,
+                "wait_seconds": round(self.wait_seconds, 3),
+                "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 3),
+            }
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport that sends every request through an `AdaptiveLimiter`
+    and retries throttled and transient failures.
+    """
+
+    def __init__(self, limiter: AdaptiveLimiter, transport: Optional[httpx.AsyncBaseTransport] = None,
+                 max_retries: int = RATE_LIMIT_MAX_RETRIES):
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self._transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        tokens = estimate_request_tokens(request)
+        for attempt in range(self.max_retries + 1):
+            admitted = await self.limiter.acquire_async(tokens)
+            try:
+                response = await self._transport.handle_async_request(request)
+            except BaseException as e:
+                self.limiter.release(admitted)
+                if not is_retryable(request.method, error=e) or attempt == self.max_retries:
+                    raise
+                retry_after = None
+            else:
+                retry_after = retry_after_seconds(response.headers)
+                self.limiter.release(admitted, response.status_code, retry_after)
+                if not is_retryable(request.method, status_code=response.status_code) or attempt == self.max_retries:
+                    return response
+                await response.aclose()
+            self.limiter.note_retry()
+            await asyncio.sleep(backoff_delay(attempt, retry_after))
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name: str, rpm: Optional[int] = None, tpm: Optional[int] = None) -> AdaptiveLimiter:
+    """
+    Shared limiter of a provider, created with the given budgets on first use.
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = AdaptiveLimiter(name, rpm=rpm, tpm=tpm)
+        return _limiters[name]
+
+
+def rate_limit_stats() -> Dict[str, dict]:
+    """
+    Budgets, current window and 429/retry counts of every provider.
+    """
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.stats() for limiter in limiters}
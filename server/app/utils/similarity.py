@@ -0,0 +1,64 @@
+from typing import TYPE_CHECKING, Optional, Sequence
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def normalize_rows(vectors: Sequence[Sequence[float]]) -> "np.ndarray":
+    """
+    Stack vectors into a float32 matrix with unit-length rows.
+    Zero vectors stay zero so their similarity comes out as 0.
+
+    Args:
+        vectors: Embeddings, one per row.
+    Returns:
+        np.ndarray: Matrix of shape (n, dim).
+    """
+    import numpy as np
+
+    if len(vectors) and isinstance(vectors[0], np.ndarray):
+        # Rows from the embedding cache are already float32 arrays
+        matrix = np.stack(vectors).astype(np.float32, copy=False)
+    else:
+        matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        # A single vector, or an empty batch
+        matrix = matrix.reshape(1, -1) if matrix.size else matrix.reshape(0, 0)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def pairwise_cosine(first: Sequence[Sequence[float]], second: Sequence[Sequence[float]]) -> "np.ndarray":
+    """
+    Cosine similarity of each row in `first` with the same row in `second`.
+
+    Args:
+        first: Embeddings of shape (n, dim), e.g. the first answers.
+        second: Embeddings of shape (n, dim), e.g. the last answers.
+    Returns:
+        np.ndarray: Similarities of shape (n,).
+    """
+    import numpy as np
+
+    first_matrix = normalize_rows(first)
+    second_matrix = normalize_rows(second)
+    if first_matrix.shape != second_matrix.shape:
+        raise ValueError(f"Shape mismatch: {first_matrix.shape} vs {second_matrix.shape}")
+    return np.einsum("ij,ij->i", first_matrix, second_matrix)
+
+
+def all_pairs_cosine(first: Sequence[Sequence[float]], second: Optional[Sequence[Sequence[float]]] = None) -> "np.ndarray":
+    """
+    Cosine similarity of every row in `first` with every row in `second`.
+    When `second` is omitted, `first` is compared with itself.
+
+    Args:
+        first: Embeddings of shape (n, dim).
+        second: Embeddings of shape (m, dim).
+    Returns:
+        np.ndarray: Similarity matrix of shape (n, m).
+    """
+    first_matrix = normalize_rows(first)
+    second_matrix = first_matrix if second is None else normalize_rows(second)
+    return first_matrix @ second_matrix.T
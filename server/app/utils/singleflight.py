@@ -0,0 +1,110 @@
+"""
+Single-flight coalescing of identical in-flight calls.
+
+When several callers ask for the same thing at the same time (e.g. two
+screens requesting TTS for one question, or a double-submitted follow-up),
+only the first call runs. The others wait for its result or exception
+instead of sending a duplicate API request. Nothing is cached once the call
+finishes; that is left to the caches in front of the calls.
+"""
+import json
+import asyncio
+import hashlib
+import threading
+import functools
+from typing import Callable, Dict, Optional
+
+
+def _default_key(*args, **kwargs) -> str:
+    payload = json.dumps([args, kwargs], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlightGroup:
+    """
+    In-flight calls of one function, keyed by request key.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._tasks: Dict[str, dict] = {}
+
+    async def run(self, key: str, call: Callable):
+        """
+        Await the in-flight call for `key`, starting `call()` if there is none.
+        The shared call runs as its own task, so one waiter being cancelled
+        does not cancel it for the others; it is cancelled once no caller is
+        left waiting for it.
+        """
+        with self._lock:
+            self.calls += 1
+            flight = self._tasks.get(key)
+            if flight is None:
+                self.executions += 1
+                flight = {"task": asyncio.ensure_future(call()), "waiters": 0}
+                self._tasks[key] = flight
+                flight["task"].add_done_callback(lambda done, key=key, flight=flight: self._forget(key, flight))
+            else:
+                self.coalesced += 1
+            flight["waiters"] += 1
+
+        try:
+            return await asyncio.shield(flight["task"])
+        finally:
+            with self._lock:
+                flight["waiters"] -= 1
+                abandoned = flight["waiters"] == 0
+            if abandoned and not flight["task"].done():
+                flight["task"].cancel()
+
+    def _forget(self, key: str, flight: dict):
+        with self._lock:
+            if self._tasks.get(key) is flight:
+                del self._tasks[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._tasks),
+            }
+
+
+_groups: Dict[str, SingleFlightGroup] = {}
+
+
+def single_flight(name: Optional[str] = None, key: Optional[Callable[..., str]] = None):
+    """
+    Decorator that coalesces concurrent calls of a coroutine function with
+    the same arguments.
+
+    Args:
+        name (str): Name reported in the stats (default: module.function).
+        key (Callable): Builds the request key from the call arguments
+            (default: hash of all arguments).
+    """
+    def decorator(function):
+        group_name = name or f"{function.__module__}.{function.__qualname__}"
+        group = _groups.setdefault(group_name, SingleFlightGroup(group_name))
+        make_key = key or _default_key
+
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            return await group.run(make_key(*args, **kwargs), lambda: function(*args, **kwargs))
+
+        wrapper.single_flight = group
+        return wrapper
+    return decorator
+
+
+def single_flight_stats() -> Dict[str, dict]:
+    """
+    Call, execution and coalesced counts of every single-flight function.
+    """
+    return {name: group.stats() for name, group in _groups.items()}
@@ -0,0 +1,24 @@
+import os
+import re
+from fastapi.staticfiles import StaticFiles
+
+# How long browsers may keep content-addressed static files (seconds)
+STATIC_IMMUTABLE_MAX_AGE = int(os.getenv("STATIC_IMMUTABLE_MAX_AGE", str(365 * 24 * 60 * 60)))
+
+# Generated files named by UUID (images and their variants) or content hash (TTS cache)
+IMMUTABLE_FILE_NAME = re.compile(
+    r"^(?:[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|[0-9a-f]{64})(?:_[a-z]+)?\.[a-z0-9]+$"
+)
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """
+    StaticFiles that lets browsers and CDNs cache generated files forever.
+    Their names change whenever their content does, so they never need revalidation.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if IMMUTABLE_FILE_NAME.match(os.path.basename(full_path)):
+            response.headers["Cache-Control"] = f"public, max-age={STATIC_IMMUTABLE_MAX_AGE}, immutable"
+        return response
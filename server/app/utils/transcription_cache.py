@@ -0,0 +1,108 @@
+import os
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional
+
+# SQLite file holding transcriptions and how long they stay valid (seconds)
+TRANSCRIPTION_CACHE_PATH = os.getenv("TRANSCRIPTION_CACHE_PATH", "./cache/transcriptions.sqlite3")
+TRANSCRIPTION_CACHE_TTL = float(os.getenv("TRANSCRIPTION_CACHE_TTL", str(24 * 60 * 60)))
+
+# Expired rows are purged at most this often (seconds)
+_PURGE_INTERVAL = 60.0
+
+
+class TranscriptionCache:
+    """
+    Transcriptions keyed by (model, sha256 of the uploaded audio) with a TTL.
+
+    Retried uploads of the same recording get the stored text instead of
+    another speech-to-text call. Entries live in a local SQLite file so every
+    worker on the host shares them.
+    """
+
+    def __init__(self, path: str = TRANSCRIPTION_CACHE_PATH, ttl: float = TRANSCRIPTION_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._last_purge = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Open the SQLite file on first use.
+        """
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS transcriptions ("
+                " model TEXT NOT NULL,"
+                " audio_hash TEXT NOT NULL,"
+                " text TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " PRIMARY KEY (model, audio_hash))"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, model: str, audio_hash: str) -> Optional[str]:
+        """
+        Return the cached transcription, or None when missing or expired.
+        """
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT text, created_at FROM transcriptions WHERE model = ? AND audio_hash = ?",
+                (model, audio_hash),
+            ).fetchone()
+            if row and time.time() - row[1] <= self.ttl:
+                self.hits += 1
+                return row[0]
+            if row:
+                self.expired += 1
+            return None
+
+    def put(self, model: str, audio_hash: str, text: str):
+        """
+        Store a transcription and purge expired ones.
+        Misses are counted here, once per speech-to-text call actually made,
+        so a lookup that is repeated before the call is not counted twice.
+        """
+        now = time.time()
+        with self._lock:
+            self.misses += 1
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO transcriptions (model, audio_hash, text, created_at) VALUES (?, ?, ?, ?)",
+                (model, audio_hash, text, now),
+            )
+            if now - self._last_purge > _PURGE_INTERVAL:
+                conn.execute("DELETE FROM transcriptions WHERE created_at < ?", (now - self.ttl,))
+                self._last_purge = now
+            conn.commit()
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters; every hit is a speech-to-text call saved.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            stored = self._connection().execute("SELECT COUNT(*) FROM transcriptions").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "calls_saved": self.hits,
+                "expired": self.expired,
+                "stored": stored,
+                "ttl": self.ttl,
+            }
+
+
+transcription_cache = TranscriptionCache()
@@ -0,0 +1,212 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+# Cache location and disk budget (bytes) for synthesized speech
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "./static/tts/cache/")
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Files read within this many seconds are never evicted (a response may still be sending them)
+TTS_CACHE_EVICT_GRACE = float(os.getenv("TTS_CACHE_EVICT_GRACE", "300"))
+# Temp files of writes older than this are left over from crashed processes
+TTS_CACHE_TEMP_MAX_AGE = float(os.getenv("TTS_CACHE_TEMP_MAX_AGE", "3600"))
+
+
+class TTSCache:
+    """
+    Content-addressed store for TTS audio with LRU eviction.
+
+    Files are named after a hash of (text, model, voice, format), so the same
+    question always maps to the same file and concurrent requests never
+    overwrite each other's audio. File mtimes are used as the access clock,
+    which keeps the LRU order across restarts.
+
+    The directory is scanned on first use, not at import. Files served within
+    the last `evict_grace` seconds are not evicted, since a `FileResponse` may
+    still be reading them; the cache can then run over budget until they age.
+    """
+
+    def __init__(self, cache_dir: str = TTS_CACHE_DIR, max_bytes: int = TTS_CACHE_MAX_BYTES, evict_grace: float = TTS_CACHE_EVICT_GRACE):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.evict_grace = evict_grace
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = None  # file name -> (size, last access), least recently used first
+        self._total_bytes = 0
+
+    def _load(self) -> OrderedDict:
+        """
+        Create the directory, remove stale temp files and index the cached files
+        on first use. Call with the lock held.
+        """
+        if self._entries is not None:
+            return self._entries
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entries = []
+        stale_before = time.time() - TTS_CACHE_TEMP_MAX_AGE
+        for path in self.cache_dir.iterdir():
+            try:
+                stat = path.stat()
+                if path.name.startswith(".tmp-"):
+                    if stat.st_mtime < stale_before:
+                        path.unlink()
+                elif path.is_file() and not path.name.startswith("."):
+                    entries.append((stat.st_mtime, path.name, stat.st_size))
+            except FileNotFoundError:
+                continue
+        self._entries = OrderedDict()
+        for mtime, name, size in sorted(entries):
+            self._entries[name] = (size, mtime)
+            self._total_bytes += size
+        return self._entries
+
+    @staticmethod
+    def make_key(text: str, model: str, voice: str, response_format: str) -> str:
+        """
+        Hash the inputs that determine the synthesized audio.
+        """
+        payload = json.dumps([text, model, voice, response_format], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str, response_format: str) -> Path:
+        """
+        Location of the cached audio file for a key.
+        """
+        return self.cache_dir / f"{key}.{response_format}"
+
+    def get(self, key: str, response_format: str) -> Optional[str]:
+        """
+        Return the cached file path for a key, or None on a miss.
+        """
+        path = self.path_for(key, response_format)
+        with self._lock:
+            entries = self._load()
+            if path.name in entries and path.exists():
+                self.hits += 1
+                entries[path.name] = (entries[path.name][0], time.time())
+                entries.move_to_end(path.name)
+                os.utime(path)
+                return str(path)
+            if path.name in entries:
+                self._total_bytes -= entries.pop(path.name)[0]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, response_format: str, data: bytes) -> str:
+        """
+        Atomically store audio bytes under a key and evict old entries if needed.
+
+        Returns:
+            str: Path to the cached audio file.
+        """
+        writer = self.open_writer(key, response_format)
+        writer.write(data)
+        return writer.commit()
+
+    def open_writer(self, key: str, response_format: str) -> "TTSCacheWriter":
+        """
+        Start writing audio for a key chunk by chunk, e.g. while it is being streamed.
+        """
+        with self._lock:
+            self._load()
+        return TTSCacheWriter(self, key, response_format)
+
+    def _commit(self, tmp_path: str, key: str, response_format: str) -> str:
+        """
+        Move a fully written temp file into place and account for its size.
+        """
+        path = self.path_for(key, response_format)
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            entries = self._load()
+            if path.name in entries:
+                self._total_bytes -= entries.pop(path.name)[0]
+            entries[path.name] = (size, time.time())
+            self._total_bytes += size
+            self._evict()
+        return str(path)
+
+    def _evict(self):
+        """
+        Drop least recently used files until the cache fits its disk budget.
+        The newest entry and files read within the grace period are kept.
+        """
+        in_use_after = time.time() - self.evict_grace
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            name, (size, accessed) = next(iter(self._entries.items()))
+            if accessed > in_use_after:
+                break  # Everything newer was used even more recently
+            try:
+                (self.cache_dir / name).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:
+                break  # Still open elsewhere (Windows); retry on the next commit
+            del self._entries[name]
+            self._total_bytes -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters and current disk usage.
+        """
+        with self._lock:
+            entries = self._load()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class TTSCacheWriter:
+    """
+    Incrementally writes one cache entry to a temp file.
+    The entry only becomes visible on `commit`, so an interrupted stream never
+    leaves partial audio in the cache.
+    """
+
+    def __init__(self, cache: TTSCache, key: str, response_format: str):
+        self.cache = cache
+        self.key = key
+        self.response_format = response_format
+        fd, self.tmp_path = tempfile.mkstemp(dir=cache.cache_dir, prefix=".tmp-")
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes):
+        self._file.write(chunk)
+
+    def commit(self) -> str:
+        """
+        Publish the written audio and return its cache path.
+        """
+        self._file.close()
+        return self.cache._commit(self.tmp_path, self.key, self.response_format)
+
+    def discard(self):
+        """
+        Drop the partially written audio.
+        """
+        self._file.close()
+        try:
+            os.remove(self.tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+tts_cache = TTSCache()
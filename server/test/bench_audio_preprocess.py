@@ -0,0 +1,55 @@
+"""
+Compare transcribing a recording as uploaded vs after audio normalization.
+
+Prints the bytes and audio seconds removed and the end-to-end transcription
+latency of both files (uses the "stt" provider, so point it at the stub
+server or a real key).
+
+Run from the server directory:
+    PYTHONPATH=. python test/bench_audio_preprocess.py test/test_converted.wav [--repeat 3]
+"""
+import os
+import time
+import asyncio
+import argparse
+from app.utils.audio_preprocess import normalize_audio
+from app.utils.async_openai_client import transcribe_audio
+
+
+async def timed_transcription(path: str, repeat: int) -> float:
+    """
+    Best-of-N transcription latency in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await transcribe_audio(path)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", help="Recording to transcribe")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    result = normalize_audio(args.path)
+    try:
+        print(f"method:        {result.method}")
+        print(f"bytes:         {result.input_bytes} -> {result.output_bytes} ({result.input_bytes - result.output_bytes} saved)")
+        if result.input_seconds is not None and result.output_seconds is not None:
+            print(f"audio seconds: {result.input_seconds:.2f} -> {result.output_seconds:.2f}")
+        print(f"preprocess:    {result.elapsed * 1000:.1f} ms")
+
+        original = await timed_transcription(args.path, args.repeat)
+        normalized = await timed_transcription(result.path, args.repeat)
+        print(f"transcription: {original * 1000:.0f} ms -> {normalized * 1000:.0f} ms "
+              f"({(original - normalized - result.elapsed) * 1000:.0f} ms saved incl. preprocessing)")
+    finally:
+        if result.changed:
+            os.remove(result.path)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
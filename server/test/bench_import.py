@@ -0,0 +1,69 @@
+"""
+Cold-start benchmark: how long a fresh worker process takes to import the app.
+
+Each run imports `app.main` in a new interpreter, the way a restarted or
+newly scaled worker does, and reports the wall time and the slowest
+top-level imports from `python -X importtime`.
+
+Run from the server directory:
+    PYTHONPATH=. python test/bench_import.py [--runs N] [--module app.main]
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+import time
+
+
+def import_once(module: str) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], check=True, capture_output=True)
+    return time.perf_counter() - started
+
+
+def slowest_imports(module: str, count: int = 15):
+    """
+    (cumulative microseconds, package) of the slowest imports directly under `module`.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], check=True, capture_output=True, text=True)
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            timings.append((int(cumulative), name.rstrip()))
+        except ValueError:
+            continue  # Header line
+    # Only packages imported at the first or second nesting level
+    top = [(us, name.strip()) for us, name in timings if len(name) - len(name.lstrip()) <= 3]
+    return sorted(top, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--module", default="app.main")
+    args = parser.parse_args()
+
+    os.environ.setdefault("PYTHONPATH", ".")
+    import_once(args.module)  # Warm the bytecode cache
+    timings = [import_once(args.module) for _ in range(args.runs)]
+
+    print(f"import {args.module}: {args.runs} runs")
+    print(f"median : {statistics.median(timings) * 1000:.0f} ms")
+    print(f"min    : {min(timings) * 1000:.0f} ms")
+    print("slowest imports (cumulative):")
+    for us, name in slowest_imports(args.module):
+        print(f"  {us / 1000:8.1f} ms  {name}")
+    for heavy in ("numpy", "scipy", "PIL"):
+        loaded = subprocess.run(
+            [sys.executable, "-c", f"import sys, {args.module}; print('{heavy}' in sys.modules)"],
+            check=True, capture_output=True, text=True,
+        ).stdout.strip()
+        print(f"{heavy} loaded at import: {loaded}")
+
+
+if __name__ == "__main__":
+    main()
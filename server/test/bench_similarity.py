@@ -0,0 +1,63 @@
+"""
+Microbenchmark: per-pair scipy cosine vs the vectorized similarity engine.
+
+Run from the server directory:
+    PYTHONPATH=. python test/bench_similarity.py
+"""
+import time
+import numpy as np
+from scipy.spatial.distance import cosine
+from app.utils.similarity import pairwise_cosine
+
+# Number of first/last answer pairs and embedding size (text-embedding-3-small)
+PAIRS = 1000
+DIM = 1536
+REPEAT = 5
+
+rng = np.random.default_rng(0)
+first_array = rng.standard_normal((PAIRS, DIM)).astype(np.float32)
+last_array = rng.standard_normal((PAIRS, DIM)).astype(np.float32)
+# Raw API responses are Python lists; the embedding cache returns one float32 array per text
+first = first_array.tolist()
+last = last_array.tolist()
+first_rows = list(first_array)
+last_rows = list(last_array)
+
+
+def per_pair_scipy():
+    return [1 - cosine(a, b) for a, b in zip(first, last)]
+
+
+def vectorized():
+    return pairwise_cosine(first, last).tolist()
+
+
+def vectorized_from_rows():
+    return pairwise_cosine(first_rows, last_rows).tolist()
+
+
+def vectorized_from_arrays():
+    return pairwise_cosine(first_array, last_array).tolist()
+
+
+def best_of(fn):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+scipy_time = best_of(per_pair_scipy)
+numpy_time = best_of(vectorized)
+rows_time = best_of(vectorized_from_rows)
+array_time = best_of(vectorized_from_arrays)
+max_diff = max(abs(a - b) for a, b in zip(per_pair_scipy(), vectorized()))
+
+print(f"{PAIRS} pairs x {DIM} dims (best of {REPEAT})")
+print(f"scipy per-pair : {scipy_time * 1000:.2f} ms")
+print(f"numpy (lists)  : {numpy_time * 1000:.2f} ms  ({scipy_time / numpy_time:.1f}x)")
+print(f"numpy (rows)   : {rows_time * 1000:.2f} ms  ({scipy_time / rows_time:.1f}x)")
+print(f"numpy (arrays) : {array_time * 1000:.2f} ms  ({scipy_time / array_time:.1f}x)")
+print(f"max abs diff   : {max_diff:.2e}")
@@ -0,0 +1,127 @@
+"""
+Local OpenAI-compatible stand-in for exercising the provider registry
+without network access or API cost.
+
+Run from the server directory:
+    python test/openai_stub_server.py --port 9100
+
+Then point any task (or all of them) at it:
+    AI_BASE_URL=http://127.0.0.1:9100/v1 AI_API_KEY=stub uvicorn app.main:app
+    AI_FOLLOW_UP_BASE_URL=http://127.0.0.1:9100/v1 AI_FOLLOW_UP_API_KEY=stub uvicorn app.main:app
+
+GET /stub/stats returns how many requests each endpoint received.
+test/test_provider_routing.py starts this app in-process for its routing checks.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import time
+from collections import Counter
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+app = FastAPI(title="OpenAI stub")
+request_counts = Counter()
+
+# 1x1 transparent PNG
+STUB_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+)
+STUB_REPLY = "오늘도 좋은 하루 보내셨군요! 가장 기억에 남는 순간은 언제였나요?"
+STUB_RECORD_DRAFT = {
+    "summary": "오늘은 딸이랑 산책을 다녀와서 참 기분 좋은 하루였어요.",
+    "title": "딸과 함께한 가을 산책",
+    "keywords": ["딸", "산책", "가을"],
+}
+
+
+def _embedding(text: str, dim: int = 64) -> list:
+    """
+    Deterministic pseudo-embedding derived from the text hash.
+    """
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [((digest[i % len(digest)] / 255.0) - 0.5) for i in range(dim)]
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    request_counts["chat"] += 1
+    model = body.get("model", "stub")
+    created = int(time.time())
+
+    if body.get("stream"):
+        def events():
+            for token in STUB_REPLY.split(" "):
+                chunk = {
+                    "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {"content": token + " "}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    content = STUB_REPLY
+    if body.get("response_format", {}).get("type") == "json_schema":
+        content = json.dumps(STUB_RECORD_DRAFT, ensure_ascii=False)
+
+    return {
+        "id": "chatcmpl-stub", "object": "chat.completion", "created": created, "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    }
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    request_counts["embeddings"] += 1
+    inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+    return {
+        "object": "list",
+        "model": body.get("model", "stub"),
+        "data": [{"object": "embedding", "index": i, "embedding": _embedding(text)} for i, text in enumerate(inputs)],
+        "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)},
+    }
+
+
+@app.post("/v1/audio/speech")
+async def speech(request: Request):
+    body = await request.json()
+    request_counts["speech"] += 1
+    return Response(content=b"ID3" + body["input"].encode("utf-8"), media_type="audio/mpeg")
+
+
+@app.post("/v1/audio/transcriptions")
+async def transcriptions(request: Request):
+    await request.body()
+    request_counts["transcriptions"] += 1
+    return {"text": "안녕하세요 오늘은 산책을 다녀왔어요"}
+
+
+@app.post("/v1/images/generations")
+async def image_generations(request: Request):
+    await request.json()
+    request_counts["images"] += 1
+    return {"created": int(time.time()), "data": [{"url": str(request.base_url) + "stub/image.png"}]}
+
+
+@app.get("/stub/image.png")
+async def stub_image():
+    return Response(content=STUB_PNG, media_type="image/png")
+
+
+@app.get("/stub/stats")
+async def stub_stats():
+    return JSONResponse(dict(request_counts))
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
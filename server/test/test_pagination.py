@@ -0,0 +1,60 @@
+"""
+Keyset pagination and field projection of the list endpoints.
+
+Pages must cover every record exactly once, a request without `limit` must
+still return every record, and `fields=` must return only the requested
+fields, serialized like the full response.
+
+Run from the server directory:
+    PYTHONPATH=. python -m pytest test/test_pagination.py
+"""
+import os
+import sys
+from fastapi.testclient import TestClient
+from app import database
+from app.main import app
+
+sys.path.insert(0, os.path.dirname(__file__))
+from test_record_queries import override_get_db, queries_for, seed  # noqa: E402
+
+
+def test_record_pages_and_fields():
+    app.dependency_overrides[database.get_db] = override_get_db
+    client = TestClient(app)
+    try:
+        seed(60)
+        # No limit: every record, no cursor
+        response = client.get("/records/")
+        assert len(response.json()) == 60
+        assert "X-Next-Cursor" not in response.headers
+
+        seen = []
+        path = "/records/?limit=25"
+        while path:
+            response = client.get(path)
+            assert response.status_code == 200, response.text
+            seen += [record["id"] for record in response.json()]
+            cursor = response.headers.get("X-Next-Cursor")
+            path = f"/records/?limit=25&cursor={cursor}" if cursor else None
+        assert seen == list(range(60, 0, -1))
+
+        # Projection skips the image and keyword queries and keeps the schema's serialization
+        records, count = queries_for(client, "/records/?limit=5&fields=title,created_at")
+        assert records[0] == {"id": 60, "title": "기록 59", "created_at": "2024-11-01T00:00:00"}
+        assert count == 1
+
+        assert client.get("/records/?fields=secret").status_code == 400
+        assert client.get("/records/?cursor=bogus").status_code == 400
+
+        # An elder with nothing yet is an empty page, not a missing resource
+        for path in ("/answers/?elder_id=999", "/guides/?elder_id=999"):
+            response = client.get(path)
+            assert response.status_code == 200, response.text
+            assert response.json() == []
+    finally:
+        app.dependency_overrides.pop(database.get_db, None)
+
+
+if __name__ == "__main__":
+    test_record_pages_and_fields()
+    print("ok")
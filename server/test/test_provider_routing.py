@@ -0,0 +1,85 @@
+"""
+Per-task provider routing against the local OpenAI stub server.
+
+Starts `openai_stub_server.py` on a free port, routes only the follow_up task
+to it and checks that follow-up calls reach the stub while every other task
+still goes to the default endpoint.
+
+Run from the server directory:
+    PYTHONPATH=. python -m pytest test/test_provider_routing.py
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import threading
+import httpx
+import pytest
+import uvicorn
+from openai import APIConnectionError
+
+sys.path.insert(0, os.path.dirname(__file__))
+import openai_stub_server  # noqa: E402
+from app.utils import async_openai_client, rate_limiter  # noqa: E402
+from app.utils.providers import ProviderRegistry, load_configs  # noqa: E402
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def stub_url():
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(openai_stub_server.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    for _ in range(100):
+        if server.started:
+            break
+        time.sleep(0.05)
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+@pytest.fixture
+def routed(monkeypatch, stub_url):
+    # Everything goes to a closed port except follow_up, which goes to the stub
+    monkeypatch.setenv("AI_BASE_URL", f"http://127.0.0.1:{_free_port()}/v1")
+    monkeypatch.setenv("AI_API_KEY", "unused")
+    monkeypatch.setenv("AI_FOLLOW_UP_BASE_URL", f"{stub_url}/v1")
+    monkeypatch.setenv("AI_FOLLOW_UP_API_KEY", "stub")
+    monkeypatch.setenv("AI_FOLLOW_UP_MODEL", "stub-follow-up")
+    monkeypatch.setattr(async_openai_client, "providers", ProviderRegistry(load_configs()))
+    monkeypatch.setattr(rate_limiter, "backoff_delay", lambda attempt, retry_after=None: 0)
+    return async_openai_client.providers
+
+
+def _stub_counts(stub_url: str) -> dict:
+    return httpx.get(f"{stub_url}/stub/stats").json()
+
+
+def test_follow_up_is_routed_to_its_own_endpoint(routed, stub_url):
+    config = routed.config("follow_up")
+    assert config.base_url == f"{stub_url}/v1"
+    assert config.provider == "custom"
+    assert config.model == "stub-follow-up"
+    assert routed.config("summary").base_url != config.base_url
+
+    before = _stub_counts(stub_url).get("chat", 0)
+    question = asyncio.run(async_openai_client.generate_follow_up_question([
+        {"question": "오늘 기분은 어떠셨나요?", "answer": "산책을 다녀와서 좋았어요."},
+    ]))
+    assert question == openai_stub_server.STUB_REPLY
+    assert _stub_counts(stub_url)["chat"] == before + 1
+
+
+def test_other_tasks_keep_the_default_endpoint(routed, stub_url):
+    before = _stub_counts(stub_url).get("chat", 0)
+    with pytest.raises(APIConnectionError):
+        asyncio.run(async_openai_client.summarize_text("Q: 안녕하세요\nA: 네"))
+    assert _stub_counts(stub_url).get("chat", 0) == before
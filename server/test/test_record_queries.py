@@ -0,0 +1,94 @@
+"""
+Query count of the record list endpoints.
+
+Both list endpoints must run the same number of SQL queries no matter how
+many records there are (no per-record image/keyword lookups).
+
+Run from the server directory:
+    PYTHONPATH=. python -m pytest test/test_record_queries.py
+"""
+from datetime import date, datetime
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app import database, models
+from app.main import app
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+statements = []
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    statements.append(statement)
+
+
+def override_get_db():
+    db = TestingSession()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def seed(record_count: int):
+    """
+    Recreate the tables with one elder owning `record_count` records, each
+    with an image and two keywords.
+    """
+    database.Base.metadata.drop_all(bind=engine)
+    database.Base.metadata.create_all(bind=engine)
+    now = datetime(2024, 11, 1)
+    db = TestingSession()
+    db.add(models.Elder(id=1, name="김복순", birth_date=date(1940, 1, 1), gender="F", care_level="3", created_at=now))
+    keywords = [models.Keyword(keyword=f"키워드{index}", created_at=now) for index in range(4)]
+    db.add_all(keywords)
+    db.flush()
+    for index in range(record_count):
+        record = models.Record(title=f"기록 {index}", content="내용", elder_id=1, created_at=now)
+        db.add(record)
+        db.flush()
+        db.add(models.Image(record_id=record.id, url=f"/static/images/{index}.png", created_at=now))
+        for keyword in keywords[index % 3:index % 3 + 2]:
+            db.add(models.RecordKeyword(record_id=record.id, keyword_id=keyword.id, created_at=now))
+    db.commit()
+    db.close()
+
+
+def queries_for(client: TestClient, path: str):
+    statements.clear()
+    response = client.get(path)
+    assert response.status_code == 200, response.text
+    return response.json(), len(statements)
+
+
+def test_record_lists_use_constant_queries():
+    app.dependency_overrides[database.get_db] = override_get_db
+    client = TestClient(app)
+    try:
+        counts = {}
+        for record_count in (1, 30):
+            seed(record_count)
+            for path in ("/records/", "/records/user/1"):
+                records, count = queries_for(client, path)
+                assert len(records) == record_count
+                counts.setdefault(path, []).append(count)
+
+        for path, (few, many) in counts.items():
+            assert few == many, f"{path}: {few} queries for 1 record, {many} for 30"
+            assert many <= 3, f"{path}: {many} queries"
+
+        # Details still come through: newest first, image and keywords in link order
+        records, _ = queries_for(client, "/records/user/1")
+        assert records[0]["title"] == "기록 29"
+        assert records[0]["image"] == "/static/images/29.png"
+        assert records[0]["keywords"] == ["키워드2", "키워드3"]
+    finally:
+        app.dependency_overrides.pop(database.get_db, None)
+
+
+if __name__ == "__main__":
+    test_record_lists_use_constant_queries()
+    print("ok")